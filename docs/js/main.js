@@ -1,13 +1,46 @@
 /**
  * main.js
- * Handles search functionality and interactions for the Anki-PTSI website.
+ * Loads each subject's decks on demand, renders them in a virtualized window of batches
+ * and handles search for the Anki-PTSI website.
  */
 
 document.addEventListener('DOMContentLoaded', () => {
+    const BATCH_SIZE = 24;  // Deck cards added or removed at a time (whole rows for 1-4, 6 or 8 columns)
+    const MAX_BATCHES = 4;  // Batches kept in the DOM per subject; the others are replaced by spacers
+
     const searchInput = document.getElementById('search-input');
-    const deckCards = document.querySelectorAll('.deck-card');
-    const subjectSections = document.querySelectorAll('.subject-section');
+    const subjectSections = Array.from(document.querySelectorAll('.subject-section'));
     const noResultsMessage = document.getElementById('no-results');
+    const cardTemplate = document.getElementById('deck-card-template');
+
+    // Per-section state: loaded decks, decks matching the search, rendered window
+    const sections = new Map();
+    subjectSections.forEach(section => {
+        const grid = section.querySelector('.deck-grid');
+        const sentinel = section.querySelector('.deck-grid-sentinel');
+
+        // Spacers stand in for the batches removed above and below the rendered window
+        const topSpacer = document.createElement('div');
+        const bottomSpacer = document.createElement('div');
+        topSpacer.className = bottomSpacer.className = 'deck-grid-spacer';
+        grid.before(topSpacer);
+        sentinel.after(bottomSpacer);
+
+        sections.set(section, {
+            grid,
+            sentinel,
+            topSpacer,
+            bottomSpacer,
+            subject: normalizeText(section.querySelector('.subject-title').textContent),
+            decks: null,
+            visible: [],
+            first: 0,         // Index (in `visible`) of the first rendered deck
+            end: 0,           // Index after the last rendered deck
+            topHeights: [],   // Heights of the batches removed above, most recent last
+            bottomHeights: [],
+            loading: null
+        });
+    });
 
     // Focus search on slash key press
     document.addEventListener('keydown', (e) => {
@@ -29,53 +62,218 @@ document.addEventListener('DOMContentLoaded', () => {
         return text.normalize("NFD").replace(/[\u0300-\u036f]/g, "").toLowerCase();
     }
 
-    function filterDecks(query) {
-        let visibleCount = 0;
-
-        // resets if query is empty
-        if (!query) {
-            deckCards.forEach(card => card.classList.remove('hidden'));
-            subjectSections.forEach(section => section.classList.remove('hidden'));
-            if (noResultsMessage) noResultsMessage.style.display = 'none';
-            return;
+    // ---- LAZY LOADING ----
+
+    function loadSection(section) {
+        const state = sections.get(section);
+        if (!state.loading) {
+            state.loading = fetch(section.dataset.src)
+                .then(response => {
+                    if (!response.ok) throw new Error(`Subject not found: ${section.dataset.src}`);
+                    return response.json();
+                })
+                .then(decks => {
+                    decks.forEach(deck => { deck.searchable = state.subject + " " + normalizeText(deck.name); });
+                    state.decks = decks;
+                    state.visible = decks;
+                    renderSection(section);
+                })
+                .catch(err => {
+                    console.error(err);
+                    state.loading = null; // Allow a retry on next scroll/search
+                });
+        }
+        return state.loading;
+    }
+
+    function loadAllSections() {
+        return Promise.all(subjectSections.map(loadSection));
+    }
+
+    // ---- RENDERING ----
+
+    function createDeckCard(deck) {
+        const card = cardTemplate.content.firstElementChild.cloneNode(true);
+        card.id = deck.id;
+        card.querySelector('.deck-name').textContent = deck.name;
+        card.querySelector('.deck-date').textContent = deck.date;
+        card.querySelector('.deck-size').textContent = deck.size;
+        card.querySelector('.deck-cards').textContent = `${deck.cards} cartes`;
+        card.querySelector('.copy-link-btn').dataset.deckId = deck.id;
+
+        const previewBtn = card.querySelector('.preview-btn');
+        previewBtn.dataset.previewUrl = deck.preview;
+        previewBtn.dataset.deckTitle = deck.name;
+
+        card.querySelector('.download-btn').href = deck.url;
+        return card;
+    }
+
+    function setSpacer(spacer, height) {
+        spacer.style.height = `${Math.max(0, height)}px`;
+    }
+
+    function spacerHeight(spacer) {
+        return parseFloat(spacer.style.height) || 0;
+    }
+
+    function renderSection(section, startIndex = 0) {
+        const state = sections.get(section);
+        state.grid.replaceChildren();
+        state.grid.removeAttribute('aria-busy');
+        state.first = state.end = Math.floor(startIndex / BATCH_SIZE) * BATCH_SIZE;
+        state.topHeights = [];
+        state.bottomHeights = [];
+        setSpacer(state.topSpacer, 0);
+        setSpacer(state.bottomSpacer, 0);
+        showNext(section);
+    }
+
+    function createBatch(state, start, end) {
+        const fragment = document.createDocumentFragment();
+        for (let i = start; i < end; i++) {
+            fragment.appendChild(createDeckCard(state.visible[i]));
+        }
+        return fragment;
+    }
+
+    // Remove `count` cards from one end of the grid and return the height they took
+    function removeCards(state, count, fromStart) {
+        const before = state.grid.offsetHeight;
+        for (let i = 0; i < count; i++) {
+            (fromStart ? state.grid.firstElementChild : state.grid.lastElementChild).remove();
+        }
+        return before - state.grid.offsetHeight;
+    }
+
+    // Append the next batch, dropping the first one if the window is full
+    function showNext(section) {
+        const state = sections.get(section);
+        if (state.end >= state.visible.length) return;
+
+        const end = Math.min(state.visible.length, state.end + BATCH_SIZE);
+        state.grid.appendChild(createBatch(state, state.end, end));
+        state.end = end;
+        if (state.bottomHeights.length) {
+            setSpacer(state.bottomSpacer, spacerHeight(state.bottomSpacer) - state.bottomHeights.pop());
         }
 
+        if (state.end - state.first > MAX_BATCHES * BATCH_SIZE) {
+            const height = removeCards(state, BATCH_SIZE, true);
+            state.topHeights.push(height);
+            setSpacer(state.topSpacer, spacerHeight(state.topSpacer) + height);
+            state.first += BATCH_SIZE;
+        }
+        observeEdges(state);
+    }
+
+    // Prepend the previous batch, dropping the last one if the window is full
+    function showPrevious(section) {
+        const state = sections.get(section);
+        if (state.first === 0) return;
+
+        const start = state.first - BATCH_SIZE;
+        const before = state.grid.offsetHeight;
+        state.grid.prepend(createBatch(state, start, state.first));
+        const added = state.grid.offsetHeight - before;
+        state.first = start;
+
+        // The spacer shrinks by the batch's height; if it was never measured (deep link),
+        // keep the content in view by scrolling by the difference
+        const recorded = state.topHeights.length ? state.topHeights.pop() : 0;
+        setSpacer(state.topSpacer, spacerHeight(state.topSpacer) - recorded);
+        if (added !== recorded) window.scrollBy(0, added - recorded);
+
+        if (state.end - state.first > MAX_BATCHES * BATCH_SIZE) {
+            const lastStart = Math.floor((state.end - 1) / BATCH_SIZE) * BATCH_SIZE;
+            const height = removeCards(state, state.end - lastStart, false);
+            state.bottomHeights.push(height);
+            setSpacer(state.bottomSpacer, spacerHeight(state.bottomSpacer) + height);
+            state.end = lastStart;
+        }
+        observeEdges(state);
+    }
+
+    // Re-observe so an edge still on screen triggers the next batch
+    function observeEdges(state) {
+        [state.topSpacer, state.sentinel, state.bottomSpacer].forEach(el => observer.unobserve(el));
+        if (state.first > 0) observer.observe(state.topSpacer);
+        if (state.end < state.visible.length) {
+            observer.observe(state.sentinel);
+            observer.observe(state.bottomSpacer);
+        }
+    }
+
+    // Sections load when they get close to the viewport, then render more as the user scrolls
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            if (!entry.isIntersecting) return;
+            const section = entry.target.closest('.subject-section');
+            const state = sections.get(section);
+
+            if (!state.decks) loadSection(section);
+            else if (entry.target === state.topSpacer) showPrevious(section);
+            else showNext(section);
+        });
+    }, { rootMargin: '400px 0px' });
+
+    sections.forEach(state => observer.observe(state.sentinel));
+
+    // ---- SEARCH ----
+
+    let searchGeneration = 0;
+
+    function filterDecks(query) {
+        const generation = ++searchGeneration;
         const normalizedQuery = normalizeText(query);
         const queryTokens = normalizedQuery.split(/\s+/).filter(token => token.length > 0);
 
-        subjectSections.forEach(section => {
-            const sectionCards = section.querySelectorAll('.deck-card');
-            let hasVisibleCards = false;
+        // Searching needs every subject; an empty query only resets the loaded ones
+        const ready = queryTokens.length > 0 ? loadAllSections() : Promise.resolve();
 
-            const subject = normalizeText(section.querySelector('.subject-title').textContent);
+        ready.then(() => {
+            if (generation !== searchGeneration) return; // A newer search is pending
 
-            sectionCards.forEach(card => {
-                const title = normalizeText(card.querySelector('.deck-name').textContent);
-                const searchableContent = subject + " " + title;
+            let visibleCount = 0;
 
-                // Check if ALL words/tokens from the query are found in the content (AND logic)
-                const isMatch = queryTokens.every(token => searchableContent.includes(token));
-
-                if (isMatch) {
-                    card.classList.remove('hidden');
-                    hasVisibleCards = true;
-                    visibleCount++;
-                } else {
-                    card.classList.add('hidden');
+            sections.forEach((state, section) => {
+                if (!state.decks) {
+                    section.classList.toggle('hidden', queryTokens.length > 0);
+                    return;
                 }
+
+                // Check if ALL words/tokens from the query are found in the content (AND logic)
+                state.visible = queryTokens.length === 0
+                    ? state.decks
+                    : state.decks.filter(deck => queryTokens.every(token => deck.searchable.includes(token)));
+
+                // Hide the entire subject section if no cards match
+                section.classList.toggle('hidden', state.visible.length === 0 && queryTokens.length > 0);
+                visibleCount += state.visible.length;
+                renderSection(section);
             });
 
-            // Hide the entire subject section if no cards match
-            if (hasVisibleCards) {
-                section.classList.remove('hidden');
-            } else {
-                section.classList.add('hidden');
+            // Show "No results" message
+            if (noResultsMessage) {
+                noResultsMessage.style.display = queryTokens.length > 0 && visibleCount === 0 ? 'block' : 'none';
             }
         });
+    }
 
-        // Show "No results" message
-        if (noResultsMessage) {
-            noResultsMessage.style.display = visibleCount === 0 ? 'block' : 'none';
-        }
+    // ---- SHARED LINKS (#deck-...) ----
+
+    if (window.location.hash.startsWith('#deck-')) {
+        const deckId = decodeURIComponent(window.location.hash.slice(1));
+
+        loadAllSections().then(() => {
+            for (const [section, state] of sections) {
+                const index = (state.decks || []).findIndex(deck => deck.id === deckId);
+                if (index === -1) continue;
+
+                renderSection(section, index);
+                document.getElementById(deckId).scrollIntoView({ block: 'center' });
+                break;
+            }
+        });
     }
 });
@@ -4,8 +4,9 @@
  */
 
 document.addEventListener('DOMContentLoaded', () => {
+    // Deck cards are rendered lazily by main.js, so clicks are delegated from the document.
+
     // ---- COPY LINK LOGIC ----
-    const copyBtns = document.querySelectorAll('.copy-link-btn');
     const toast = document.getElementById('toast-notification');
 
     function showToast() {
@@ -18,23 +19,23 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 2000);
     }
 
-    copyBtns.forEach(btn => {
-        btn.addEventListener('click', (e) => {
-            e.preventDefault();
-            const deckId = btn.getAttribute('data-deck-id');
-            const url = new URL(window.location.href);
-            url.hash = deckId;
-
-            navigator.clipboard.writeText(url.toString()).then(() => {
-                showToast();
-            }).catch(err => {
-                console.error("Failed to copy URL: ", err);
-            });
+    document.addEventListener('click', (e) => {
+        const btn = e.target.closest('.copy-link-btn');
+        if (!btn) return;
+
+        e.preventDefault();
+        const deckId = btn.getAttribute('data-deck-id');
+        const url = new URL(window.location.href);
+        url.hash = deckId;
+
+        navigator.clipboard.writeText(url.toString()).then(() => {
+            showToast();
+        }).catch(err => {
+            console.error("Failed to copy URL: ", err);
         });
     });
 
     // ---- PREVIEW LOGIC ----
-    const previewBtns = document.querySelectorAll('.preview-btn');
     const modal = document.getElementById('preview-modal');
     const closeBtn = document.getElementById('close-modal');
 
@@ -97,44 +98,47 @@ document.addEventListener('DOMContentLoaded', () => {
         nextBtn.disabled = currentIndex === currentCards.length - 1;
     }
 
-    previewBtns.forEach(btn => {
-        btn.addEventListener('click', async (e) => {
-            e.preventDefault();
-            const previewUrl = btn.getAttribute('data-preview-url');
-            const deckTitle = btn.getAttribute('data-deck-title');
-
-            titleEl.textContent = "Chargement...";
-            flashcardFront.innerHTML = "<div class='loading'>Chargement des cartes...</div>";
-            flashcardBack.innerHTML = "";
-            currentIdxEl.textContent = "--";
-            totalCardsEl.textContent = "--";
-            prevBtn.disabled = true;
-            nextBtn.disabled = true;
-            resetCard();
+    document.addEventListener('click', async (e) => {
+        const btn = e.target.closest('.preview-btn');
+        if (!btn) return;
+
+        e.preventDefault();
+        const previewUrl = btn.getAttribute('data-preview-url');
+        const deckTitle = btn.getAttribute('data-deck-title');
+
+        titleEl.textContent = "Chargement...";
+        flashcardFront.innerHTML = "<div class='loading'>Chargement des cartes...</div>";
+        flashcardBack.innerHTML = "";
+        currentIdxEl.textContent = "--";
+        totalCardsEl.textContent = "--";
+        prevBtn.disabled = true;
+        nextBtn.disabled = true;
+        resetCard();
+
+        openModal();
+
+        try {
+            // Revalidated with the server instead of cache-busted: unchanged previews cost a 304,
+            // and sw.js serves them from its cache (offline too) when their hash did not change
+            const response = await fetch(previewUrl, { cache: 'no-cache' });
+            if (!response.ok) throw new Error("Preview not found");
 
-            openModal();
-
-            try {
-                const response = await fetch(`${previewUrl}?t=${new Date().getTime()}`);
-                if (!response.ok) throw new Error("Preview not found");
-
-                const cards = await response.json();
-
-                if (cards && cards.length > 0) {
-                    currentCards = cards;
-                    currentIndex = 0;
-                    titleEl.textContent = deckTitle;
-                    updateCardDisplay();
-                } else {
-                    titleEl.textContent = "Deck invalide";
-                    flashcardFront.innerHTML = "Aucune carte trouvée pour ce deck.";
-                }
-            } catch (err) {
-                console.error(err);
-                titleEl.textContent = "Erreur";
-                flashcardFront.innerHTML = "Impossible de charger l'aperçu du deck.<br>Ce deck n'a peut-être pas encore été régénéré.";
+            const cards = await response.json();
+
+            if (cards && cards.length > 0) {
+                currentCards = cards;
+                currentIndex = 0;
+                titleEl.textContent = deckTitle;
+                updateCardDisplay();
+            } else {
+                titleEl.textContent = "Deck invalide";
+                flashcardFront.innerHTML = "Aucune carte trouvée pour ce deck.";
             }
-        });
+        } catch (err) {
+            console.error(err);
+            titleEl.textContent = "Erreur";
+            flashcardFront.innerHTML = "Impossible de charger l'aperçu du deck.<br>Ce deck n'a peut-être pas encore été régénéré.";
+        }
     });
 
     closeBtn.addEventListener('click', closeModal);
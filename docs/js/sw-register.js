@@ -0,0 +1,13 @@
+/**
+ * sw-register.js
+ * Registers the service worker (sw.js) that keeps the site and viewed decks available offline.
+ */
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        // updateViaCache: 'none' so a new deploy (new sw.js) is picked up on the next visit
+        navigator.serviceWorker.register('sw.js', { updateViaCache: 'none' }).catch(err => {
+            console.error("Service worker registration failed: ", err);
+        });
+    });
+}
@@ -0,0 +1,171 @@
+/**
+ * sw.js
+ * Generated by scripts/generate_index.py from templates/sw_template.js — do not edit.
+ *
+ * Offline-first cache driven by precache-manifest.json. Every file is cached under
+ * "<path>?v=<hash>", so a file whose hash did not change is served from the cache
+ * without touching the network, and a changed file is fetched again (revalidated
+ * against the HTTP cache). Previews and images are cached the first time a deck is
+ * viewed; the older copy is kept as an offline fallback until a newer one is fetched.
+ */
+
+const VERSION = '7ea53406cf844e2ea29762f0f176b743a4bc3fd6';
+const MANIFEST_URL = 'precache-manifest.json';
+const ASSET_CACHE = 'ptsi-assets';
+const RUNTIME_CACHE = 'ptsi-runtime';
+
+// Third-party files needed to render the pages offline (MathJax, fonts, ogl)
+const RUNTIME_ORIGINS = ['https://cdn.jsdelivr.net', 'https://fonts.googleapis.com', 'https://fonts.gstatic.com'];
+
+const SCOPE_URL = self.registration.scope;
+const SCOPE_PATH = new URL(SCOPE_URL).pathname;
+
+// ---- MANIFEST ----
+
+function assetUrl(path) {
+    return new URL(encodeURI(path), SCOPE_URL).href;
+}
+
+function versionedUrl(asset) {
+    return `${assetUrl(asset.url)}?v=${asset.hash}`;
+}
+
+function manifestKey() {
+    return `${assetUrl(MANIFEST_URL)}?v=${VERSION}`;
+}
+
+// Path of a request relative to the site root, as written in the manifest
+function pathOf(url) {
+    const path = decodeURIComponent(url.pathname.slice(SCOPE_PATH.length));
+    return path === '' || path.endsWith('/') ? `${path}index.html` : path;
+}
+
+// The worker can be stopped at any time, so the manifest is re-read from the cache when needed
+let manifestPromise = null;
+
+function getManifest() {
+    if (!manifestPromise) {
+        manifestPromise = caches.open(ASSET_CACHE)
+            .then(cache => cache.match(manifestKey()))
+            .then(response => {
+                if (!response) throw new Error(`Precache manifest ${VERSION} missing`);
+                return response.json();
+            })
+            .then(manifest => new Map(manifest.assets.map(asset => [asset.url, asset])))
+            .catch(err => {
+                manifestPromise = null;
+                throw err;
+            });
+    }
+    return manifestPromise;
+}
+
+async function fetchAndCache(cache, asset) {
+    // 'no-cache' revalidates with the server (ETag) instead of trusting the HTTP cache
+    const response = await fetch(new Request(assetUrl(asset.url), { cache: 'no-cache' }));
+    if (response.ok) {
+        await cache.delete(assetUrl(asset.url), { ignoreSearch: true }); // Older versions
+        await cache.put(versionedUrl(asset), response.clone());
+    }
+    return response;
+}
+
+// ---- LIFECYCLE ----
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(ASSET_CACHE);
+        const response = await fetch(MANIFEST_URL, { cache: 'no-cache' });
+        if (!response.ok) throw new Error(`Precache manifest not found: ${response.status}`);
+
+        const manifest = await response.clone().json();
+        await cache.put(manifestKey(), response);
+
+        // Only files whose hash changed since the previous version are downloaded
+        const missing = [];
+        for (const asset of manifest.assets) {
+            if (asset.precache && !(await cache.match(versionedUrl(asset)))) missing.push(asset);
+        }
+        await Promise.all(missing.map(asset => fetchAndCache(cache, asset)));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const assets = await getManifest();
+        const cache = await caches.open(ASSET_CACHE);
+        const current = new Set([manifestKey(), ...Array.from(assets.values(), versionedUrl)]);
+
+        for (const request of await cache.keys()) {
+            if (current.has(request.url)) continue;
+            // Keep older previews/images of viewed decks until a newer copy is fetched
+            const asset = assets.get(pathOf(new URL(request.url)));
+            if (asset && !asset.precache) continue;
+            await cache.delete(request);
+        }
+        await self.clients.claim();
+    })());
+});
+
+// ---- FETCH ----
+
+// Manifest entry for a path; "decks" (GitHub Pages pretty URL) is served by "decks.html"
+function findAsset(assets, path) {
+    return assets.get(path) || assets.get(`${path}.html`);
+}
+
+async function fromManifest(request, path) {
+    const assets = await getManifest().catch(() => null);
+    let asset = assets && findAsset(assets, path);
+    if (!asset && assets && request.mode === 'navigate') {
+        // Unknown page: try the network, then fall back to the cached home page
+        try {
+            return await fetch(request);
+        } catch (err) {
+            asset = assets.get('index.html');
+            if (!asset) throw err;
+        }
+    }
+    if (!asset) return fetch(request); // .apkg downloads, sitemap...
+
+    const cache = await caches.open(ASSET_CACHE);
+    const cached = await cache.match(versionedUrl(asset));
+    if (cached) return cached;
+
+    try {
+        return await fetchAndCache(cache, asset);
+    } catch (err) {
+        // Offline: serve the previous version of the file if there is one
+        const previous = await cache.match(assetUrl(asset.url), { ignoreSearch: true });
+        if (previous) return previous;
+        throw err;
+    }
+}
+
+async function staleWhileRevalidate(event) {
+    const cache = await caches.open(RUNTIME_CACHE);
+    const cached = await cache.match(event.request);
+    const network = fetch(event.request).then(response => {
+        if (response.ok || response.type === 'opaque') {
+            return cache.put(event.request, response.clone()).then(() => response);
+        }
+        return response;
+    });
+
+    if (!cached) return network;
+    event.waitUntil(network.catch(() => null));
+    return cached;
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin === self.location.origin && url.pathname.startsWith(SCOPE_PATH)) {
+        event.respondWith(fromManifest(request, pathOf(url)));
+    } else if (RUNTIME_ORIGINS.includes(url.origin)) {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
\ No newline at end of file
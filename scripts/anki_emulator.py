@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+import utils
+
+# --- CONFIGURATION ---
+SCRIPT_PATH = os.path.realpath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_PATH)
+BASE_DIR = os.path.dirname(SCRIPT_DIR)
+
+DECKS_DIR = os.path.join(BASE_DIR, "decks")
+
+# Modèles présents dans un profil Anki neuf
+DEFAULT_MODELS: Dict[str, List[str]] = {
+    "Basic": ["Front", "Back"],
+    "Basic (and reversed card)": ["Front", "Back"],
+    "Basic (optional reversed card)": ["Front", "Back", "Add Reverse"],
+    "Basic (type in the answer)": ["Front", "Back"],
+    "Cloze": ["Text", "Back Extra"],
+}
+
+class AnkiConnectError(Exception):
+    """Erreur renvoyée dans le champ "error" de la réponse AnkiConnect."""
+
+class AnkiConnectEmulator:
+    """
+    Collection Anki en mémoire qui répond comme l'add-on AnkiConnect (version 6).
+    Seules les actions utilisées par les scripts du dépôt sont implémentées.
+
+    - `latency` : délai (secondes) ajouté à chaque requête reçue.
+    - `media_dir` : si fourni, les médias reçus y sont aussi écrits
+      (il joue le rôle de collection.media pour export_with_media.py).
+    - `requests` / `actions` : compteurs par action, hors et avec le contenu des `multi`.
+    - `max_in_flight` : nombre maximal de requêtes traitées en même temps.
+    """
+
+    def __init__(self, latency: float = 0.0, media_dir: Optional[str] = None,
+                 models: Optional[Dict[str, List[str]]] = None) -> None:
+        self.latency = latency
+        self.media_dir = media_dir
+        self.models = dict(models or DEFAULT_MODELS)
+        self.decks: Dict[str, int] = {"Default": 1}
+        self.notes: Dict[int, Dict[str, Any]] = {}
+        self.media: Dict[str, bytes] = {}
+        # Index des premiers champs pour la détection de doublons de addNotes
+        self._first_fields: set = set()
+        self.requests: Counter = Counter()
+        self.actions: Counter = Counter()
+        self.bytes_received = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._next_id = int(time.time() * 1000)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._previous_url: Optional[str] = None
+        self.url: Optional[str] = None
+
+    # --- Requests ---
+
+    def handle(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Traite une requête AnkiConnect déjà décodée et retourne la réponse."""
+        action = payload.get("action", "")
+        with self._lock:
+            self.requests[action] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            result = self._dispatch(action, payload.get("params") or {})
+            return {"result": result, "error": None}
+        except AnkiConnectError as e:
+            return {"result": None, "error": str(e)}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _dispatch(self, action: str, params: Dict[str, Any]) -> Any:
+        handler = getattr(self, f"_action_{action}", None)
+        if handler is None:
+            raise AnkiConnectError("unsupported action")
+
+        with self._lock:
+            self.actions[action] += 1
+
+        if action == "multi":
+            return handler(**params)
+        with self._lock:
+            return handler(**params)
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    # --- Actions ---
+
+    def _action_version(self) -> int:
+        return 6
+
+    def _action_deckNames(self) -> List[str]:
+        return sorted(self.decks)
+
+    def _action_createDeck(self, deck: str) -> int:
+        # Like Anki, creating "A::B" also creates "A"
+        parts = deck.split("::")
+        for i in range(1, len(parts) + 1):
+            name = "::".join(parts[:i])
+            if name not in self.decks:
+                self.decks[name] = self._new_id()
+        return self.decks[deck]
+
+    def _action_modelNames(self) -> List[str]:
+        return list(self.models)
+
+    def _action_modelFieldNames(self, modelName: str) -> List[str]:
+        if modelName not in self.models:
+            raise AnkiConnectError(f"model was not found: {modelName}")
+        return list(self.models[modelName])
+
+    def _action_findNotes(self, query: str) -> List[int]:
+        query = query.strip()
+        if query.startswith('"') and query.endswith('"'):
+            query = query[1:-1]
+
+        if query in ("", "*"):
+            return list(self.notes)
+        if not query.startswith("deck:"):
+            raise AnkiConnectError(f"unsupported query: {query}")
+
+        deck = query[len("deck:"):]
+        return [
+            note_id for note_id, note in self.notes.items()
+            if note["deckName"] == deck or note["deckName"].startswith(deck + "::")
+        ]
+
+    def _action_notesInfo(self, notes: List[int]) -> List[Dict[str, Any]]:
+        infos = []
+        for note_id in notes:
+            note = self.notes.get(note_id)
+            if note is None:
+                infos.append({})
+                continue
+            infos.append({
+                "noteId": note_id,
+                "modelName": note["modelName"],
+                "tags": list(note["tags"]),
+                "fields": {
+                    name: {"value": value, "order": order}
+                    for order, (name, value) in enumerate(note["fields"].items())
+                },
+                "cards": [],
+            })
+        return infos
+
+    def _action_addNotes(self, notes: List[Dict[str, Any]]) -> List[Optional[int]]:
+        return [self._add_note(note) for note in notes]
+
+    def _add_note(self, note: Dict[str, Any]) -> Optional[int]:
+        deck = note.get("deckName")
+        model = note.get("modelName")
+        if deck not in self.decks or model not in self.models:
+            return None
+
+        fields = {name: note.get("fields", {}).get(name, "") for name in self.models[model]}
+        first = fields[self.models[model][0]]
+        if not first.strip():
+            return None
+
+        options = note.get("options") or {}
+        if not options.get("allowDuplicate", False):
+            if options.get("duplicateScope") == "deck":
+                duplicate = (model, deck, first) in self._first_fields
+            else:
+                duplicate = (model, first) in self._first_fields
+            if duplicate:
+                return None
+        self._first_fields.add((model, deck, first))
+        self._first_fields.add((model, first))
+
+        note_id = self._new_id()
+        self.notes[note_id] = {
+            "deckName": deck,
+            "modelName": model,
+            "fields": fields,
+            "tags": list(note.get("tags") or []),
+        }
+        return note_id
+
+    def _action_storeMediaFile(self, filename: str, data: Optional[str] = None,
+                               path: Optional[str] = None, **_: Any) -> str:
+        if data is not None:
+            content = base64.b64decode(data)
+        elif path is not None:
+            with open(path, 'rb') as f:
+                content = f.read()
+        else:
+            raise AnkiConnectError("storeMediaFile requires data or path")
+
+        self.media[filename] = content
+        if self.media_dir:
+            with open(os.path.join(self.media_dir, filename), 'wb') as f:
+                f.write(content)
+        return filename
+
+    def _action_multi(self, actions: List[Dict[str, Any]]) -> List[Any]:
+        results = []
+        for sub in actions:
+            try:
+                results.append(self._dispatch(sub.get("action", ""), sub.get("params") or {}))
+            except AnkiConnectError as e:
+                results.append({"result": None, "error": str(e)})
+        return results
+
+    # --- HTTP server ---
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Démarre le serveur HTTP dans un thread et retourne son URL."""
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                with emulator._lock:
+                    emulator.bytes_received += len(body)
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    payload = {}
+                response = json.dumps(emulator.handle(payload)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    def stop(self) -> None:
+        """Arrête le serveur HTTP."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "AnkiConnectEmulator":
+        """Démarre le serveur et redirige utils.anki_connect_request vers lui."""
+        self.start()
+        self._previous_url = utils.ANKI_CONNECT_URL
+        utils.ANKI_CONNECT_URL = self.url
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        utils.ANKI_CONNECT_URL = self._previous_url
+        self.stop()
+
+def run_benchmark(latency: float, jobs: int = 1) -> None:
+    """Importe tout decks/ dans l'émulateur puis réexporte tout, en mesurant chaque étape."""
+    import imports_decks
+    import export_with_media
+
+    csv_files = sorted(
+        os.path.join(root, f)
+        for root, _, files in os.walk(DECKS_DIR)
+        for f in files if f.endswith('.csv')
+    )
+
+    work_dir = tempfile.mkdtemp(prefix="anki_emulator_")
+    anki_media = os.path.join(work_dir, "collection.media")
+    os.makedirs(anki_media)
+
+    saved_dirs = (export_with_media.OUTPUT_DIR, export_with_media.MEDIA_REPO_DIR)
+    export_with_media.OUTPUT_DIR = os.path.join(work_dir, "decks")
+    export_with_media.MEDIA_REPO_DIR = os.path.join(work_dir, "media")
+
+    try:
+        with AnkiConnectEmulator(latency=latency, media_dir=anki_media) as anki:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                model = imports_decks.get_anki_model()
+                fields = imports_decks.get_model_fields(model)
+                report = imports_decks.import_files(csv_files, model, fields)
+                imported = time.perf_counter()
+                import_requests = sum(anki.requests.values())
+
+                deck_names = utils.anki_connect_request("deckNames")["result"]
+                export_with_media.export_decks(deck_names, anki_media, jobs=jobs)
+                exported = time.perf_counter()
+
+            cards = len(anki.notes)
+            export_requests = sum(anki.requests.values()) - import_requests
+
+            print(f"📚 {len(csv_files)} fichiers, {cards} cartes, {len(anki.media)} médias")
+            print(f"⏱️  Latence simulée : {latency * 1000:.1f} ms/requête")
+            print(f"📥 Import : {imported - start:.2f} s, {import_requests} requêtes "
+                  f"({cards / (imported - start):,.0f} cartes/s)")
+            print(f"📤 Export ({jobs} en parallèle) : {exported - imported:.2f} s, {export_requests} requêtes "
+                  f"({cards / (exported - imported):,.0f} cartes/s)")
+            print(f"📨 Octets reçus : {anki.bytes_received:,}")
+            print("⏳ Étapes de l'import (secondes cumulées sur les threads) :")
+            for stage in report.stages:
+                print(f"   {stage.name:<8} ×{stage.threads}  travail {stage.busy:6.2f} s | attente {stage.wait:6.2f} s")
+            print("📊 Requêtes par action :")
+            for action, count in sorted(anki.requests.items()):
+                print(f"   {action} : {count}")
+    finally:
+        export_with_media.OUTPUT_DIR, export_with_media.MEDIA_REPO_DIR = saved_dirs
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="In-memory AnkiConnect stand-in for tests and benchmarks.")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Added delay per request, in seconds (default: 0)")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="Port to listen on with --serve (default: 8765)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Decks exported concurrently in the benchmark (default: 1)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Serve until interrupted instead of running the benchmark")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🧪 ÉMULATEUR ANKICONNECT")
+    print("="*60)
+
+    if not args.serve:
+        run_benchmark(args.latency, args.jobs)
+        return
+
+    anki = AnkiConnectEmulator(latency=args.latency)
+    print(f"🌐 En écoute sur {anki.start(port=args.port)} (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        anki.stop()
+        print(f"\n📊 Requêtes : {dict(anki.requests)}")
+
+if __name__ == "__main__":
+    main()
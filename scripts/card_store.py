@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import csv
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from utils import slugify
+
+# --- CONFIGURATION ---
+SCRIPT_PATH = os.path.realpath(__file__)
+SCRIPT_DIR = os.path.dirname(SCRIPT_PATH)
+BASE_DIR = os.path.dirname(SCRIPT_DIR)
+
+DECKS_DIR = os.path.join(BASE_DIR, "decks")
+MEDIA_DIR = os.path.join(BASE_DIR, "media")
+STORE_PATH = os.path.join(BASE_DIR, "build", "cards.sqlite")
+
+# Incrémenter à chaque changement du schéma ou des règles de normalisation
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS decks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    subject TEXT NOT NULL,
+    base_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    card_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    path TEXT
+);
+CREATE TABLE IF NOT EXISTS media_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_deck ON cards(deck_id);
+CREATE INDEX IF NOT EXISTS media_card ON media(card_id);
+"""
+
+MEDIA_REF_RE = re.compile(r'src="([^"]+)"')
+MEDIA_PATH_RE = re.compile(r'src="[^"]*/([^"/]+)"')
+
+class StoredDeck(NamedTuple):
+    id: int
+    path: str           # relatif à decks/, ex. "Maths/15_Polynômes.csv"
+    subject: str        # dossier de premier niveau, "Divers" à la racine
+    base_name: str      # nom du fichier sans .csv
+    sha1: str
+    card_count: int
+
+class StoredCard(NamedTuple):
+    line: int
+    front: str          # champs prêts pour Anki (src="image.jpg")
+    back: str
+    tags: List[str]
+    sha1: str
+    media: List[Tuple[str, Optional[str]]]  # (nom du fichier, chemin absolu ou None si introuvable)
+
+# --- PARSING ---
+
+def normalize_field(value: str) -> str:
+    """Nettoie les guillemets doublés laissés par certains exports."""
+    return value.replace('""', '"').strip('"')
+
+def clean_media_paths(text: str) -> str:
+    """Transforme <img src="../media/si/photo.jpg"> en <img src="photo.jpg">."""
+    return MEDIA_PATH_RE.sub(r'src="\1"', text)
+
+def extract_media_names(text: str) -> List[str]:
+    """Retourne les noms des images locales référencées par src="..."."""
+    return [os.path.basename(ref) for ref in MEDIA_REF_RE.findall(text) if not ref.startswith('http')]
+
+def index_media(media_dir: Optional[str] = None) -> Dict[str, List[str]]:
+    """Associe chaque nom de fichier de media/ à ses chemins (un seul parcours du dossier)."""
+    media_dir = media_dir or MEDIA_DIR
+    index: Dict[str, List[str]] = {}
+    for root, _, files in os.walk(media_dir):
+        for name in sorted(files):
+            index.setdefault(name, []).append(os.path.join(root, name))
+    return index
+
+def resolve_media(name: str, subfolder: str, media_index: Dict[str, List[str]]) -> Optional[str]:
+    """Trouve une image, d'abord dans media/<subfolder>/, sinon n'importe où dans media/."""
+    candidates = media_index.get(name, [])
+    for path in candidates:
+        if os.path.basename(os.path.dirname(path)) == subfolder:
+            return path
+    return candidates[0] if candidates else None
+
+def media_subfolder(subject: str, base_name: str) -> str:
+    """Sous-dossier de media/ attendu pour un deck (dernière partie du nom du deck)."""
+    prefix_dash = f"{subject.lower()}-"
+    prefix_underscore = f"{subject.lower()}_"
+    name_lower = base_name.lower()
+    if name_lower.startswith(prefix_dash):
+        base_name = base_name[len(prefix_dash):]
+    elif name_lower.startswith(prefix_underscore):
+        base_name = base_name[len(prefix_underscore):]
+    return slugify(base_name.replace('_', ' '))
+
+def parse_csv(csv_path: str, subfolder: str, media_index: Dict[str, List[str]]) -> List[StoredCard]:
+    """Lit un fichier CSV (séparateur ';') et retourne ses cartes normalisées."""
+    cards = []
+
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        reader = csv.reader(f, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+        for line, row in enumerate(reader, start=1):
+            if len(row) < 2:
+                continue
+
+            front, back = normalize_field(row[0]), normalize_field(row[1])
+            if not front.strip() and not back.strip():
+                continue
+            tags = row[2].split() if len(row) > 2 else []
+
+            names = list(dict.fromkeys(extract_media_names(front + back)))
+            front, back = clean_media_paths(front), clean_media_paths(back)
+            sha1 = hashlib.sha1("\x1f".join([front, back, " ".join(tags)]).encode('utf-8')).hexdigest()
+
+            cards.append(StoredCard(
+                line, front, back, tags, sha1,
+                [(name, resolve_media(name, subfolder, media_index)) for name in names]
+            ))
+
+    return cards
+
+def check_csv(csv_path: str) -> List[Tuple[int, str]]:
+    """Liste les lignes d'un CSV ignorées par parse_csv, avec la raison."""
+    problems = []
+
+    with open(csv_path, 'r', encoding='utf-8-sig') as f:
+        reader = csv.reader(f, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+        for line, row in enumerate(reader, start=1):
+            if not row:
+                continue
+            if len(row) < 2:
+                problems.append((line, "moins de 2 colonnes (';' manquant ou retour à la ligne non protégé ?)"))
+            elif not normalize_field(row[0]).strip() and not normalize_field(row[1]).strip():
+                problems.append((line, "carte vide"))
+
+    return problems
+
+# --- STORE ---
+
+def file_sha1(path: str) -> str:
+    """SHA-1 du contenu d'un fichier, lu par blocs."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _media_signature(media_index: Dict[str, List[str]], media_dir: str) -> str:
+    # Paths relative to media/ so the signature does not depend on where the repo is checked out;
+    # size and mtime so that replacing an image by another of the same name is noticed
+    entries = []
+    for paths in sorted(media_index.values()):
+        for path in paths:
+            stat = os.stat(path)
+            rel_path = os.path.relpath(path, media_dir).replace(os.sep, '/')
+            entries.append(f"{rel_path}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("\n".join(entries).encode('utf-8')).hexdigest()
+
+def _list_csv_files(decks_dir: str) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(decks_dir):
+        for name in files:
+            if name.endswith('.csv'):
+                paths.append(os.path.relpath(os.path.join(root, name), decks_dir))
+    return sorted(paths)
+
+def _subject_for(rel_path: str) -> str:
+    parts = rel_path.split(os.sep)
+    return parts[0] if len(parts) > 1 else 'Divers'
+
+def _connect(store_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    conn = sqlite3.connect(store_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+
+    version = None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        version = row[0] if row else None
+    except sqlite3.OperationalError:
+        pass
+
+    if version != str(SCHEMA_VERSION):
+        conn.executescript("DROP TABLE IF EXISTS media; DROP TABLE IF EXISTS cards; "
+                           "DROP TABLE IF EXISTS decks; DROP TABLE IF EXISTS meta; "
+                           "DROP TABLE IF EXISTS media_files;")
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.commit()
+
+    return conn
+
+def _write_deck(conn: sqlite3.Connection, rel_path: str, stat: os.stat_result, sha1: str,
+                cards: List[StoredCard]) -> None:
+    subject = _subject_for(rel_path)
+    base_name = os.path.basename(rel_path)[:-len('.csv')]
+
+    conn.execute("DELETE FROM decks WHERE path = ?", (rel_path,))
+    deck_id = conn.execute(
+        "INSERT INTO decks (path, subject, base_name, size, mtime_ns, sha1, card_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (rel_path, subject, base_name, stat.st_size, stat.st_mtime_ns, sha1, len(cards))
+    ).lastrowid
+
+    for card in cards:
+        card_id = conn.execute(
+            "INSERT INTO cards (deck_id, line, front, back, tags, sha1) VALUES (?, ?, ?, ?, ?, ?)",
+            (deck_id, card.line, card.front, card.back, " ".join(card.tags), card.sha1)
+        ).lastrowid
+        conn.executemany("INSERT INTO media (card_id, name, path) VALUES (?, ?, ?)",
+                         [(card_id, name, path) for name, path in card.media])
+
+def compile_store(decks_dir: Optional[str] = None, media_dir: Optional[str] = None,
+                  store_path: Optional[str] = None, verbose: bool = False) -> sqlite3.Connection:
+    """
+    Compile les CSV de decks/ dans la base SQLite et retourne la connexion.
+    Incrémental : seuls les fichiers modifiés (taille/date puis SHA-1) sont relus.
+    Si le contenu de media/ change, tous les decks sont recompilés pour mettre
+    à jour les chemins d'images.
+    Les chemins par défaut (DECKS_DIR, MEDIA_DIR, STORE_PATH) sont lus à l'appel.
+    """
+    decks_dir, media_dir = decks_dir or DECKS_DIR, media_dir or MEDIA_DIR
+    conn = _connect(store_path or STORE_PATH)
+    media_index = index_media(media_dir)
+    signature = _media_signature(media_index, media_dir)
+
+    row = conn.execute("SELECT value FROM meta WHERE key = 'media_signature'").fetchone()
+    media_changed = row is None or row[0] != signature
+
+    known = {r[0]: r[1:] for r in conn.execute("SELECT path, size, mtime_ns, sha1 FROM decks")}
+    csv_files = _list_csv_files(decks_dir)
+    compiled = 0
+
+    with conn:
+        for rel_path in set(known) - set(csv_files):
+            conn.execute("DELETE FROM decks WHERE path = ?", (rel_path,))
+
+        for rel_path in csv_files:
+            csv_path = os.path.join(decks_dir, rel_path)
+            stat = os.stat(csv_path)
+            previous = known.get(rel_path)
+
+            if previous and not media_changed:
+                if previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                sha1 = file_sha1(csv_path)
+                if sha1 == previous[2]:
+                    conn.execute("UPDATE decks SET size = ?, mtime_ns = ? WHERE path = ?",
+                                 (stat.st_size, stat.st_mtime_ns, rel_path))
+                    continue
+            else:
+                sha1 = file_sha1(csv_path)
+
+            subject = _subject_for(rel_path)
+            base_name = os.path.basename(rel_path)[:-len('.csv')]
+            try:
+                cards = parse_csv(csv_path, media_subfolder(subject, base_name), media_index)
+            except Exception as e:
+                print(f"   ❌ Erreur lecture CSV {rel_path}: {e}")
+                conn.execute("DELETE FROM decks WHERE path = ?", (rel_path,))
+                continue
+
+            _write_deck(conn, rel_path, stat, sha1, cards)
+            compiled += 1
+            if verbose:
+                print(f"   ✅ {rel_path} : {len(cards)} cartes")
+
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('media_signature', ?)", (signature,))
+
+    if verbose:
+        print(f"📦 {compiled} fichier(s) compilé(s), {len(csv_files) - compiled} inchangé(s)")
+
+    return conn
+
+def media_signature(conn: sqlite3.Connection) -> Optional[str]:
+    """Empreinte du contenu de media/ lors de la dernière compilation."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'media_signature'").fetchone()
+    return row[0] if row else None
+
+def media_sha1(conn: sqlite3.Connection, path: str) -> str:
+    """
+    SHA-1 du contenu d'une image, gardé en base tant que sa taille et sa date
+    ne changent pas : une génération sans changement ne relit aucune image.
+    """
+    stat = os.stat(path)
+    row = conn.execute("SELECT sha1 FROM media_files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                       (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+    if row:
+        return row[0]
+
+    sha1 = file_sha1(path)
+    conn.execute("INSERT OR REPLACE INTO media_files (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                 (path, stat.st_size, stat.st_mtime_ns, sha1))
+    conn.commit()
+    return sha1
+
+def load_decks(conn: sqlite3.Connection) -> List[StoredDeck]:
+    """Retourne tous les decks de la base, triés par chemin."""
+    rows = conn.execute("SELECT id, path, subject, base_name, sha1, card_count FROM decks ORDER BY path")
+    return [StoredDeck(*row) for row in rows]
+
+def load_cards(conn: sqlite3.Connection, deck_ids: Iterable[int]) -> List[StoredCard]:
+    """Retourne les cartes des decks donnés, dans l'ordre des decks puis des lignes."""
+    cards = []
+    for deck_id in deck_ids:
+        media: Dict[int, List[Tuple[str, Optional[str]]]] = {}
+        for card_id, name, path in conn.execute(
+                "SELECT m.card_id, m.name, m.path FROM media m JOIN cards c ON c.id = m.card_id "
+                "WHERE c.deck_id = ? ORDER BY m.rowid", (deck_id,)):
+            media.setdefault(card_id, []).append((name, path))
+
+        for card_id, line, front, back, tags, sha1 in conn.execute(
+                "SELECT id, line, front, back, tags, sha1 FROM cards WHERE deck_id = ? ORDER BY line", (deck_id,)):
+            cards.append(StoredCard(line, front, back, tags.split(), sha1, media.get(card_id, [])))
+    return cards
+
+def deck_matches(deck: StoredDeck, subjects: Iterable[str] = (), patterns: Iterable[str] = ()) -> bool:
+    """
+    Vérifie qu'un deck appartient à l'une des matières et correspond à l'un des
+    motifs glob (sur le nom du fichier ou le chemin dans decks/), sans tenir compte de la casse.
+    Une liste vide ne filtre rien.
+    """
+    subjects = [s.lower() for s in subjects]
+    patterns = [p.lower() for p in patterns]
+    if subjects and deck.subject.lower() not in subjects:
+        return False
+    if patterns:
+        names = (deck.base_name.lower(), deck.path.lower().replace(os.sep, '/'))
+        return any(fnmatch.fnmatchcase(n, pattern) for pattern in patterns for n in names)
+    return True
+
+def select_decks(conn: sqlite3.Connection, subjects: Iterable[str] = (), patterns: Iterable[str] = (),
+                 tags: Iterable[str] = ()) -> List[StoredDeck]:
+    """Retourne les decks sélectionnés par matière, motif glob et tag (au moins une carte portant l'un des tags)."""
+    decks = [d for d in load_decks(conn) if deck_matches(d, subjects, patterns)]
+
+    tags = {t.lower() for t in tags}
+    if tags:
+        tagged = {
+            deck_id for deck_id, card_tags in conn.execute("SELECT deck_id, tags FROM cards")
+            if tags & {t.lower() for t in card_tags.split()}
+        }
+        decks = [d for d in decks if d.id in tagged]
+
+    return decks
+
+def find_deck(conn: sqlite3.Connection, csv_path: str, decks_dir: Optional[str] = None) -> Optional[StoredDeck]:
+    """Retourne le deck compilé correspondant à un fichier de decks/, ou None."""
+    rel_path = os.path.relpath(os.path.realpath(csv_path), os.path.realpath(decks_dir or DECKS_DIR))
+    row = conn.execute("SELECT id, path, subject, base_name, sha1, card_count FROM decks WHERE path = ?",
+                       (rel_path,)).fetchone()
+    return StoredDeck(*row) if row else None
+
+def main() -> None:
+    print("="*60)
+    print("🗃️  COMPILATION DES CARTES")
+    print("="*60)
+
+    conn = compile_store(verbose=True)
+    decks = load_decks(conn)
+    total_cards = sum(d.card_count for d in decks)
+    missing = conn.execute("SELECT COUNT(*) FROM media WHERE path IS NULL").fetchone()[0]
+    conn.close()
+
+    print(f"📊 {len(decks)} decks, {total_cards} cartes -> {os.path.relpath(STORE_PATH, BASE_DIR)}")
+    if missing:
+        print(f"⚠️ {missing} image(s) introuvable(s) dans media/")
+
+if __name__ == "__main__":
+    main()
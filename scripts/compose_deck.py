@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlparse
+import card_store
+from card_store import StoredCard, StoredDeck, compile_store, load_cards, load_decks, media_signature
+from utils import slugify
+
+# --- CONFIGURATION ---
+DEFAULT_PORT = 8766
+DEFAULT_CACHE_MB = 64
+DEFAULT_DECK_NAME = "PTSI::Sélection"
+
+class Selection(NamedTuple):
+    """Sélection normalisée : matières, motifs de decks (glob) et tags, sans ordre ni casse."""
+    subjects: Tuple[str, ...]
+    decks: Tuple[str, ...]
+    tags: Tuple[str, ...]
+    name: str
+
+def make_selection(subjects: Iterable[str] = (), decks: Iterable[str] = (),
+                   tags: Iterable[str] = (), name: Optional[str] = None) -> Selection:
+    """Normalise une sélection pour que deux demandes équivalentes aient la même clé."""
+    def normalize(values: Iterable[str]) -> Tuple[str, ...]:
+        return tuple(sorted({v.strip().lower() for v in values if v.strip()}))
+
+    return Selection(normalize(subjects), normalize(decks), normalize(tags),
+                     (name or DEFAULT_DECK_NAME).strip())
+
+def deck_matches(deck: StoredDeck, selection: Selection) -> bool:
+    """Vérifie qu'un deck correspond aux matières et motifs de la sélection."""
+    return card_store.deck_matches(deck, selection.subjects, selection.decks)
+
+def card_matches(card: StoredCard, selection: Selection) -> bool:
+    """Vérifie qu'une carte porte au moins un des tags demandés."""
+    if not selection.tags:
+        return True
+    return any(tag.lower() in selection.tags for tag in card.tags)
+
+def output_filename(selection: Selection) -> str:
+    """Nom du fichier .apkg proposé au téléchargement."""
+    return f"{slugify(selection.name.replace('::', ' ')) or 'selection'}.apkg"
+
+class PackageCache:
+    """
+    Cache LRU des paquets générés, limité en octets.
+    Si plusieurs requêtes demandent la même clé en même temps, un seul thread
+    construit le paquet et les autres attendent son résultat.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, build: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """Retourne (contenu, vrai si servi sans construction par cet appel)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], True
+
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result(), True
+
+        try:
+            data = build()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            if len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self._size += len(data)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        future.set_result(data)
+        return data, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'hits': self.hits, 'misses': self.misses}
+
+class DeckComposer:
+    """Construit des paquets .apkg personnalisés à partir de la base de cartes compilée."""
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024) -> None:
+        self.cache = PackageCache(cache_bytes)
+        # The store is recompiled (incrementally) by one thread at a time
+        self._store_lock = threading.Lock()
+
+    def _select(self, selection: Selection) -> Tuple[List[StoredDeck], List[StoredCard], str]:
+        """
+        Retourne les decks retenus, leurs cartes filtrées et l'empreinte de leurs contenus.
+        Tout est lu sur la même connexion, pour que les cartes correspondent à l'empreinte
+        même si un autre thread recompile la base entre-temps.
+        """
+        with self._store_lock:
+            conn = compile_store()
+            try:
+                decks = [d for d in load_decks(conn) if deck_matches(d, selection)]
+                media = media_signature(conn)
+                cards = [c for c in load_cards(conn, [d.id for d in decks]) if card_matches(c, selection)]
+            finally:
+                conn.close()
+
+        inputs = json.dumps([selection, [(d.path, d.sha1) for d in decks], media])
+        return decks, cards, hashlib.sha1(inputs.encode('utf-8')).hexdigest()
+
+    def _build(self, selection: Selection, cards: List[StoredCard]) -> bytes:
+        # Imported here so the store and the HTTP server don't need genanki
+        from generate_apkg import build_package
+
+        fd, tmp_path = tempfile.mkstemp(suffix='.apkg')
+        os.close(fd)
+        try:
+            build_package(selection.name, cards).write_to_file(tmp_path)
+            with open(tmp_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(tmp_path)
+
+    def compose(self, selection: Selection) -> Tuple[bytes, bool]:
+        """Retourne (contenu du .apkg, vrai si servi depuis le cache)."""
+        if not (selection.subjects or selection.decks or selection.tags):
+            raise ValueError("Sélection vide : précisez une matière, un deck ou un tag.")
+
+        decks, cards, key = self._select(selection)
+        if not decks:
+            raise ValueError("Aucun deck ne correspond à la sélection.")
+        if not cards:
+            raise ValueError("Aucune carte ne correspond à la sélection.")
+        return self.cache.get_or_build(key, lambda: self._build(selection, cards))
+
+def serve(composer: DeckComposer, host: str, port: int) -> ThreadingHTTPServer:
+    """
+    Crée le serveur HTTP :
+    - GET /compose?subject=Maths&deck=1[4-7]_*&tag=X&name=... renvoie le .apkg
+    - GET /stats renvoie les statistiques du cache
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                self._send(200, json.dumps(composer.cache.stats()).encode('utf-8'), 'application/json')
+                return
+            if url.path != '/compose':
+                self._send(404, b'Not found', 'text/plain')
+                return
+
+            query = parse_qs(url.query)
+            selection = make_selection(query.get('subject', []), query.get('deck', []),
+                                       query.get('tag', []), (query.get('name') or [None])[0])
+            start = time.perf_counter()
+            try:
+                data, cached = composer.compose(selection)
+            except ValueError as e:
+                self._send(400, str(e).encode('utf-8'), 'text/plain; charset=utf-8')
+                return
+            except Exception as e:
+                print(f"   ❌ {selection.subjects} {selection.decks} {selection.tags} : {e!r}")
+                self._send(500, b'Internal error', 'text/plain')
+                return
+
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"   {'⚡' if cached else '🔨'} {selection.subjects} {selection.decks} {selection.tags} "
+                  f"-> {len(data)} octets en {elapsed:.1f} ms")
+            self._send(200, data, 'application/octet-stream', {
+                'Content-Disposition': f"attachment; filename*=UTF-8''{quote(output_filename(selection))}",
+                'X-Cache': 'HIT' if cached else 'MISS',
+            })
+
+        def _send(self, status: int, body: bytes, content_type: str,
+                  headers: Optional[Dict[str, str]] = None) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build custom Anki packages from a deck/tag selection.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_selection_args(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--subject", action="append", default=[],
+                         help="Subject folder to include, e.g. Maths (repeatable)")
+        sub.add_argument("--deck", action="append", default=[],
+                         help="Glob on deck file names, e.g. '1[4-7]_*' (repeatable)")
+        sub.add_argument("--tag", action="append", default=[],
+                         help="Keep only cards with this tag (repeatable)")
+        sub.add_argument("--name", type=str, default=None,
+                         help=f"Anki deck name (default: {DEFAULT_DECK_NAME})")
+
+    build_parser = subparsers.add_parser("build", help="Write one custom package")
+    add_selection_args(build_parser)
+    build_parser.add_argument("-o", "--output", type=str, default=None,
+                              help="Output .apkg path (default: derived from --name)")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve custom packages over HTTP")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                              help=f"Package cache size in MB (default: {DEFAULT_CACHE_MB})")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🧩 COMPOSITION DE DECKS")
+    print("="*60)
+
+    if args.command == "build":
+        selection = make_selection(args.subject, args.deck, args.tag, args.name)
+        try:
+            data, _ = DeckComposer().compose(selection)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        output = args.output or output_filename(selection)
+        with open(output, 'wb') as f:
+            f.write(data)
+        print(f"✅ Créé : {output} ({len(data) / 1024:.1f} KB)")
+        return
+
+    composer = DeckComposer(args.cache_mb * 1024 * 1024)
+    server = serve(composer, args.host, args.port)
+    print(f"🌐 http://{args.host}:{args.port}/compose?subject=Maths&deck=1[4-7]_* (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 Cache : {composer.cache.stats()}")
+
+if __name__ == "__main__":
+    main()
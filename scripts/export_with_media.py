@@ -7,7 +7,10 @@ import shutil
 import html
 import re
 import argparse
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Dict, Any, NamedTuple, Tuple
 from utils import slugify, anki_connect_request
 
 # --- CONFIGURATION ---
@@ -21,62 +24,134 @@ MEDIA_REPO_DIR = os.path.join(BASE_DIR, "media")
 # Paths specific to the user's Anki installation
 DEFAULT_ANKI_USER_PROFILE = "Utilisateur 1"
 
+# Concurrency limits for multi-deck exports
+DEFAULT_JOBS = 4
+DEFAULT_MEDIA_WORKERS = 4
+
 def get_anki_media_path(profile: str) -> str:
     return os.path.expanduser(f"~/Library/Application Support/Anki2/{profile}/collection.media")
 
-def copy_media_files(source_text: str, media_subfolder: str, anki_media_path: str) -> str:
+class MediaCopier:
+    """
+    Copie les médias d'Anki vers le dépôt, via un pool de threads si `workers` > 0
+    (sinon immédiatement). Un même fichier n'est copié qu'une fois.
+    """
+
+    def __init__(self, workers: int = 0) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._scheduled: Dict[str, Future] = {}
+        self._by_deck: Dict[str, Dict[str, Future]] = {}
+        self._lock = threading.Lock()
+
+    def _copy(self, source: str, dest: str) -> str:
+        shutil.copy2(source, dest)
+        return os.path.basename(dest)
+
+    def copy(self, source: str, dest: str, deck_name: str) -> None:
+        with self._lock:
+            future = self._scheduled.get(dest)
+            if future is None:
+                if self._pool:
+                    future = self._pool.submit(self._copy, source, dest)
+                else:
+                    future = Future()
+                    try:
+                        future.set_result(self._copy(source, dest))
+                    except Exception as e:
+                        future.set_exception(e)
+                self._scheduled[dest] = future
+            self._by_deck.setdefault(deck_name, {})[dest] = future
+
+    def succeeded(self, dest: str) -> bool:
+        """Attend la copie vers `dest` et indique si elle a réussi."""
+        with self._lock:
+            future = self._scheduled.get(dest)
+        if future is None:
+            return False
+        try:
+            future.result()
+            return True
+        except Exception:
+            return False
+
+    def results(self, deck_name: str) -> Tuple[int, List[str]]:
+        """Attend les copies d'un deck et retourne (nombre copié, erreurs)."""
+        copied, errors = 0, []
+        for future in self._by_deck.get(deck_name, {}).values():
+            try:
+                future.result()
+                copied += 1
+            except Exception as e:
+                errors.append(str(e))
+        return copied, errors
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=True)
+
+class ExportResult(NamedTuple):
+    deck: str
+    csv_path: Optional[str]
+    cards: int
+    missing_media: List[str]
+    error: Optional[str]
+    media_copied: int = 0
+    media_errors: List[str] = []
+
+# Regex pour trouver les images (src="nomfichier.ext")
+IMAGE_PATTERN = re.compile(r'src=["\']([^"\']+\.(jpg|jpeg|png|gif|svg))["\']', re.IGNORECASE)
+
+def find_media_refs(source_text: str) -> List[str]:
+    """Noms des images référencées (src="nomfichier.ext") dans le texte."""
+    return [match[0] for match in IMAGE_PATTERN.findall(source_text)]
+
+def replace_media_refs(source_text: str, media_subfolder: str, is_available: Callable[[str], bool]) -> str:
     """
     Cherche les références aux médias dans le texte.
-    Les copie du dossier Anki vers le repo.
-    Retourne le texte modifié avec les nouveaux chemins relatifs.
+    `is_available(nom)` indique si le fichier est présent dans le repo (et peut l'y copier) ;
+    le chemin des fichiers disponibles est remplacé par le chemin relatif du repo.
     """
-    target_dir = os.path.join(MEDIA_REPO_DIR, media_subfolder)
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-    
     modified_text = source_text
     
-    # Regex pour trouver les images (src="nomfichier.ext")
-    image_pattern = r'src=["\']([^"\']+\.(jpg|jpeg|png|gif|svg))["\']'
-    matches = re.findall(image_pattern, source_text, re.IGNORECASE)
-    
-    for match in matches:
-        filename = match[0]
-        anki_file_path = os.path.join(anki_media_path, filename)
-        
-        if os.path.exists(anki_file_path):
-            # Copier le fichier
-            repo_file_path = os.path.join(target_dir, filename)
-            try:
-                shutil.copy2(anki_file_path, repo_file_path)
-                print(f"  📸 Copié : {filename}")
-                
-                # Update path in text to be relative for the repo
-                # ../media/subfolder/image.jpg
-                new_relative_path = f"../media/{media_subfolder}/{filename}"
-                
-                # Replace with both quote types to be safe
-                modified_text = modified_text.replace(f'src="{filename}"', f'src="{new_relative_path}"')
-                modified_text = modified_text.replace(f"src='{filename}'", f"src='{new_relative_path}'")
-                
-            except Exception as e:
-                print(f"  ⚠️  Erreur copie {filename}: {e}")
-        else:
-            print(f"  ⚠️  Média introuvable : {filename}")
+    for filename in find_media_refs(source_text):
+        if is_available(filename):
+            # Update path in text to be relative for the repo
+            # ../media/subfolder/image.jpg
+            new_relative_path = f"../media/{media_subfolder}/{filename}"
+            
+            # Replace with both quote types to be safe
+            modified_text = modified_text.replace(f'src="{filename}"', f'src="{new_relative_path}"')
+            modified_text = modified_text.replace(f"src='{filename}'", f"src='{new_relative_path}'")
             
     return modified_text
 
-def export_deck(deck_name: str, anki_media_path: str) -> None:
-    """Exporte un deck spécifique en CSV + média."""
-    print(f"📦 Export de '{deck_name}'...")
+def copy_media_files(source_text: str, media_subfolder: str, anki_media_path: str,
+                     copier: MediaCopier, deck_name: str, missing: List[str]) -> None:
+    """
+    Confie la copie des médias du texte, du dossier Anki vers le repo, à `copier` ;
+    les fichiers introuvables sont ajoutés à `missing`.
+    Les chemins ne sont réécrits qu'une fois les copies terminées (voir export_deck).
+    """
+    target_dir = os.path.join(MEDIA_REPO_DIR, media_subfolder)
+    os.makedirs(target_dir, exist_ok=True)
     
-    # 1. Determine media subfolder
+    for filename in find_media_refs(source_text):
+        anki_file_path = os.path.join(anki_media_path, filename)
+        if not os.path.exists(anki_file_path):
+            missing.append(filename)
+            continue
+        copier.copy(anki_file_path, os.path.join(target_dir, filename), deck_name)
+
+def deck_paths(deck_name: str) -> Tuple[str, str, str]:
+    """
+    Retourne (dossier de la matière, nom du CSV sans extension, sous-dossier de media/)
+    pour un nom de deck Anki.
+    """
     # Ex: "PTSI::Maths" -> "maths"
     # Ex: "Vocabulaire" -> "vocabulaire"
     parts = deck_name.split("::")
     media_subfolder = slugify(parts[-1])
     
-    # 2. Determine file path
     if len(parts) == 1:
         subject = "divers"
         safe_filename = slugify(parts[0])
@@ -84,55 +159,103 @@ def export_deck(deck_name: str, anki_media_path: str) -> None:
         subject = slugify(parts[0])
         safe_filename = "_".join([slugify(p) for p in parts[1:]])
         
+    return subject, safe_filename, media_subfolder
+
+def export_deck(deck_name: str, anki_media_path: str, copier: Optional[MediaCopier] = None) -> ExportResult:
+    """
+    Exporte un deck spécifique en CSV + média.
+    Sans `copier`, les médias sont copiés immédiatement.
+    """
+    if copier is None:
+        copier = MediaCopier()
+        result = export_deck(deck_name, anki_media_path, copier)
+        copied, errors = copier.results(deck_name)
+        return result._replace(media_copied=copied, media_errors=errors)
+        
+    missing: List[str] = []
+    
+    # 1. Determine file path and media subfolder
+    subject, safe_filename, media_subfolder = deck_paths(deck_name)
+        
     subject_dir = os.path.join(OUTPUT_DIR, subject)
-    if not os.path.exists(subject_dir):
-        os.makedirs(subject_dir)
+    os.makedirs(subject_dir, exist_ok=True)
         
     csv_filename = os.path.join(subject_dir, f"{safe_filename}.csv")
     
-    # 3. Fetch notes from Anki
+    # 2. Fetch notes from Anki
     find_notes = anki_connect_request("findNotes", query=f'"deck:{deck_name}"')
     if not find_notes:
-        return
+        return ExportResult(deck_name, None, 0, missing, "findNotes a échoué")
         
     notes_info = anki_connect_request("notesInfo", notes=find_notes["result"])
     if not notes_info:
-        return
+        return ExportResult(deck_name, None, 0, missing, "notesInfo a échoué")
+
+    # 3. Schedule media copies while reading the notes
+    rows: List[Tuple[List[str], str]] = []
+    for note in notes_info["result"]:
+        fields_values = [html.unescape(f_obj["value"]) for f_obj in note["fields"].values()]
+        for value in fields_values:
+            copy_media_files(value, media_subfolder, anki_media_path, copier, deck_name, missing)
+        rows.append((fields_values, " ".join(note["tags"])))
+
+    # 4. Write to CSV; a path is rewritten only once its copy succeeded,
+    # a failed copy keeps the original src
+    target_dir = os.path.join(MEDIA_REPO_DIR, media_subfolder)
+
+    def is_copied(filename: str) -> bool:
+        return copier.succeeded(os.path.join(target_dir, filename))
 
-    # 4. Write to CSV
     try:
         with open(csv_filename, "w", encoding="utf-8-sig", newline="") as f:
             writer = csv.writer(f, delimiter=";")
-            count = 0
-            
-            for note in notes_info["result"]:
-                fields_values = []
+            for fields_values, tags in rows:
+                writer.writerow([replace_media_refs(value, media_subfolder, is_copied)
+                                 for value in fields_values] + [tags])
                 
-                # Process fields
-                for f_obj in note["fields"].values():
-                    raw_value = f_obj["value"]
-                    clean_value = html.unescape(raw_value)
-                    
-                    # Copy media and update paths
-                    minified_value = copy_media_files(clean_value, media_subfolder, anki_media_path)
-                    fields_values.append(minified_value)
-                
-                # Process tags
-                tags = " ".join(note["tags"])
-                fields_values.append(tags)
-                
-                writer.writerow(fields_values)
-                count += 1
-                
-        print(f"✅ OK ({count} cartes)\n")
+        return ExportResult(deck_name, csv_filename, len(rows), missing, None)
         
     except Exception as e:
-        print(f"❌ ERREUR écriture CSV : {e}\n")
+        return ExportResult(deck_name, None, 0, missing, f"écriture CSV : {e}")
+
+def export_decks(deck_names: List[str], anki_media_path: str,
+                 jobs: int = DEFAULT_JOBS, media_workers: int = DEFAULT_MEDIA_WORKERS) -> List[ExportResult]:
+    """
+    Exporte plusieurs decks en parallèle : jusqu'à `jobs` decks interrogent
+    AnkiConnect et écrivent leur CSV en même temps, pendant que `media_workers`
+    threads copient les médias. Les résultats sont dans l'ordre de `deck_names`.
+    """
+    copier = MediaCopier(media_workers)
+    results: List[Optional[ExportResult]] = [None] * len(deck_names)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = {pool.submit(export_deck, deck, anki_media_path, copier): i
+                       for i, deck in enumerate(deck_names)}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if result.error:
+                    print(f"❌ {result.deck} : {result.error}")
+                else:
+                    print(f"📦 {result.deck} : {result.cards} cartes")
+    finally:
+        copier.close()
+        
+    final = []
+    for result in results:
+        copied, errors = copier.results(result.deck)
+        final.append(result._replace(media_copied=copied, media_errors=errors))
+    return final
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Export Anki decks to CSV and extract media.")
     parser.add_argument("--profile", type=str, default=DEFAULT_ANKI_USER_PROFILE,
                         help="Anki user profile name (default: Utilisateur 1)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Decks exported concurrently (default: {DEFAULT_JOBS})")
+    parser.add_argument("--media-workers", type=int, default=DEFAULT_MEDIA_WORKERS,
+                        help=f"Threads copying media files (default: {DEFAULT_MEDIA_WORKERS})")
     args = parser.parse_args()
     
     anki_media_path = get_anki_media_path(args.profile)
@@ -166,16 +289,39 @@ def main() -> None:
             print("[ERREUR] Saisie invalide.")
             return
 
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+    run_export(target_decks, anki_media_path, args.jobs, args.media_workers)
+
+def run_export(target_decks: List[str], anki_media_path: str,
+               jobs: int = DEFAULT_JOBS, media_workers: int = DEFAULT_MEDIA_WORKERS) -> List[ExportResult]:
+    """Exporte les decks choisis et affiche le résumé."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
         
-    print(f"\nDébut de l'export pour {len(target_decks)} deck(s)...\n")
+    print(f"\nDébut de l'export pour {len(target_decks)} deck(s) "
+          f"({jobs} en parallèle, {media_workers} copies de médias)...\n")
     
-    for deck in target_decks:
-        export_deck(deck, anki_media_path)
-        
+    start = time.perf_counter()
+    results = export_decks(target_decks, anki_media_path, jobs, media_workers)
+    elapsed = time.perf_counter() - start
+    
+    print()
+    print("="*60)
+    print("✨ RÉSUMÉ")
+    print("="*60)
+    for result in results:
+        if result.error:
+            print(f"❌ {result.deck} : {result.error}")
+            continue
+        print(f"✅ {result.deck} : {result.cards} cartes, {result.media_copied} média(s) "
+              f"-> {os.path.relpath(result.csv_path, BASE_DIR)}")
+        for filename in result.missing_media:
+            print(f"  ⚠️  Média introuvable : {filename}")
+        for error in result.media_errors:
+            print(f"  ⚠️  Erreur copie : {error}")
+    
+    print(f"\n⏱️  {len(results)} deck(s) en {elapsed:.2f} s")
     print("="*60)
     print("Terminé ! N'oublie pas : git add . && git commit && git push")
+    return results
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+import zlib
+from array import array
+from typing import Dict, List, Tuple
+from utils import normalize_card_text, strip_html
+from card_store import compile_store, load_decks, load_cards as load_cards_from_store
+
+# --- MINHASH / LSH ---
+# 32 valeurs par signature, découpées en 8 bandes de 4 :
+# deux cartes similaires à 80 % tombent dans un même seau avec une probabilité ~98,5 %.
+SHINGLE_SIZE = 5
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+DEFAULT_THRESHOLD = 0.8
+
+_MAX_HASH = 0xFFFFFFFF
+_DENSIFY_OFFSET = 0x9E3779B1
+
+# (chemin relatif du CSV, numéro de ligne, recto, verso)
+Card = Tuple[str, int, str, str]
+
+_IMG_SRC_RE = re.compile(r'<img[^>]*\bsrc=["\']([^"\']+)["\']', re.IGNORECASE)
+
+def card_text(front: str, back: str) -> str:
+    """
+    Texte comparé d'une carte : recto et verso sans HTML, suivis du nom des images,
+    pour que deux cartes faites seulement d'images différentes ne soient pas confondues.
+    """
+    images = [os.path.basename(src) for src in _IMG_SRC_RE.findall(f"{front} {back}")]
+    return " ".join([strip_html(f"{front} {back}")] + images).strip()
+
+def load_cards() -> List[Card]:
+    """Lit toutes les cartes des decks depuis la base compilée."""
+    conn = compile_store()
+    cards = [
+        (stored_deck.path, card.line, card.front, card.back)
+        for stored_deck in load_decks(conn)
+        for card in load_cards_from_store(conn, [stored_deck.id])
+    ]
+    conn.close()
+    return cards
+
+def shingles(text: str) -> set:
+    """Découpe un texte normalisé en k-grammes de caractères."""
+    data = text.encode('utf-8')
+    if len(data) <= SHINGLE_SIZE:
+        return {data}
+    return {data[i:i + SHINGLE_SIZE] for i in range(len(data) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(text: str) -> array:
+    """
+    Calcule une signature MinHash à une seule permutation (one-permutation hashing).
+    Chaque k-gramme n'est haché qu'une fois puis réparti dans NUM_HASHES cases ;
+    les cases vides sont remplies par densification à partir de la case suivante.
+    """
+    sig = array('I', [_MAX_HASH]) * NUM_HASHES
+
+    for shingle in shingles(text):
+        h = zlib.crc32(shingle)
+        slot = h % NUM_HASHES
+        value = h // NUM_HASHES
+        if value < sig[slot]:
+            sig[slot] = value
+
+    # shingles() never returns an empty set, so at least one slot is filled
+    if _MAX_HASH in sig:
+        filled = [v != _MAX_HASH for v in sig]
+        for i in range(NUM_HASHES):
+            if not filled[i]:
+                distance = next(d for d in range(1, NUM_HASHES) if filled[(i + d) % NUM_HASHES])
+                source = sig[(i + distance) % NUM_HASHES]
+                sig[i] = (source + distance * _DENSIFY_OFFSET) % _MAX_HASH
+
+    return sig
+
+def estimated_similarity(signatures: array, a: int, b: int) -> float:
+    """Estime la similarité de Jaccard entre deux signatures."""
+    sig_a = signatures[a * NUM_HASHES:(a + 1) * NUM_HASHES]
+    sig_b = signatures[b * NUM_HASHES:(b + 1) * NUM_HASHES]
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_HASHES
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def find_clusters(texts: List[str], threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """
+    Regroupe les textes identiques ou proches.
+    Les doublons exacts sont regroupés par dictionnaire, puis chaque texte unique
+    est comparé (LSH par bandes) uniquement au premier représentant de chaque seau :
+    le coût reste linéaire en nombre de cartes.
+    Retourne les groupes d'indices (au moins 2 éléments) de `texts`.
+    """
+    # 1. Exact duplicates
+    unique_ids: Dict[str, int] = {}
+    card_to_unique = []
+    for text in texts:
+        card_to_unique.append(unique_ids.setdefault(text, len(unique_ids)))
+
+    unique_texts = list(unique_ids)
+    del unique_ids
+
+    # 2. Signatures, stored contiguously
+    signatures = array('I')
+    for text in unique_texts:
+        signatures.extend(minhash_signature(text))
+    raw = signatures.tobytes()
+    band_bytes = ROWS * signatures.itemsize
+    sig_bytes = NUM_HASHES * signatures.itemsize
+
+    # 3. LSH, one band at a time to bound memory
+    parent = list(range(len(unique_texts)))
+    for band in range(BANDS):
+        buckets: Dict[bytes, int] = {}
+        offset = band * band_bytes
+        for i in range(len(unique_texts)):
+            start = i * sig_bytes + offset
+            key = raw[start:start + band_bytes]
+            rep = buckets.setdefault(key, i)
+            if rep == i:
+                continue
+            root_i, root_rep = _find(parent, i), _find(parent, rep)
+            if root_i != root_rep and estimated_similarity(signatures, i, rep) >= threshold:
+                parent[root_i] = root_rep
+
+    # 4. Collect clusters of original cards
+    groups: Dict[int, List[int]] = {}
+    for card_idx, unique_idx in enumerate(card_to_unique):
+        groups.setdefault(_find(parent, unique_idx), []).append(card_idx)
+
+    clusters = [g for g in groups.values() if len(g) > 1]
+    clusters.sort(key=lambda g: (-len(g), g[0]))
+    return clusters
+
+def build_report(cards: List[Card], threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Construit la liste des groupes de doublons à partir des cartes."""
+    sources = [card_text(front, back) for _, _, front, back in cards]
+    # Cards left without any word (e.g. only formatting) cannot be compared
+    normalized = [normalize_card_text(source) for source in sources]
+    kept = [i for i, text in enumerate(normalized) if text]
+    texts = [normalized[i] for i in kept]
+    report = []
+
+    for cluster in find_clusters(texts, threshold):
+        cluster = [kept[i] for i in cluster]
+        # Normalization is lossy (accents, punctuation): "exact" is decided on the source text
+        exact = len({sources[i] for i in cluster}) == 1
+        report.append({
+            'type': 'exact' if exact else 'proche',
+            'decks': sorted({cards[i][0] for i in cluster}),
+            'cards': [
+                {'file': cards[i][0], 'line': cards[i][1], 'front': cards[i][2]}
+                for i in cluster
+            ]
+        })
+
+    return report
+
+def print_report(report: List[Dict]) -> None:
+    """Affiche le rapport de doublons."""
+    exact = sum(1 for c in report if c['type'] == 'exact')
+
+    for index, cluster in enumerate(report, start=1):
+        label = "🟰 Identiques" if cluster['type'] == 'exact' else "≈ Proches"
+        cross = " (plusieurs decks)" if len(cluster['decks']) > 1 else ""
+        print(f"[{index}] {label} — {len(cluster['cards'])} cartes{cross}")
+        for card in cluster['cards']:
+            front = " ".join(card['front'].split())
+            if len(front) > 80:
+                front = front[:77] + "..."
+            print(f"     {card['file']}:{card['line']}  {front}")
+        print()
+
+    print("="*60)
+    print(f"📊 Groupes : {len(report)} ({exact} identiques, {len(report) - exact} proches)")
+
+def synthetic_cards(count: int, seed: int = 0) -> List[Card]:
+    """
+    Génère des cartes factices pour le benchmark.
+    Le vocabulaire vient des decks du dépôt ; 10 % des cartes sont des copies
+    d'une carte précédente avec un mot modifié.
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({w for _, _, front, back in load_cards() for w in normalize_card_text(f"{front} {back}").split()})
+    if not vocabulary:
+        vocabulary = [f"mot{i}" for i in range(5000)]
+
+    cards = []
+    for i in range(count):
+        if cards and rng.random() < 0.1:
+            words = cards[rng.randrange(len(cards))][2].split()
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        else:
+            words = rng.choices(vocabulary, k=rng.randint(8, 30))
+        cards.append(("benchmark.csv", i + 1, " ".join(words), ""))
+
+    return cards
+
+def run_benchmark(count: int, threshold: float) -> None:
+    """Mesure le temps de détection sur `count` cartes factices."""
+    print(f"🧪 Génération de {count} cartes factices...")
+    cards = synthetic_cards(count)
+
+    start = time.perf_counter()
+    texts = [normalize_card_text(f"{front} {back}") for _, _, front, back in cards]
+    normalized = time.perf_counter()
+    clusters = find_clusters(texts, threshold)
+    end = time.perf_counter()
+
+    print(f"   Normalisation : {normalized - start:.2f} s")
+    print(f"   MinHash + LSH : {end - normalized:.2f} s")
+    print(f"   Total : {end - start:.2f} s ({count / (end - start):,.0f} cartes/s)")
+    print(f"   Groupes trouvés : {len(clusters)}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Detect exact and near-duplicate cards across all decks.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Minimum estimated similarity for near-duplicates (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--json", type=str, metavar="PATH",
+                        help="Also write the report as JSON to PATH")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="Time detection on N synthetic cards instead of reading decks/")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("🔎 DÉTECTION DES DOUBLONS")
+    print("="*60)
+    print()
+
+    if args.benchmark:
+        run_benchmark(args.benchmark, args.threshold)
+        return
+
+    cards = load_cards()
+    print(f"📚 Cartes lues : {len(cards)}")
+    print()
+
+    report = build_report(cards, args.threshold)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ JSON créé : {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import csv
+import argparse
+import filecmp
+import hashlib
 import os
-import re
-import sys
 import shutil
-import genanki
+import sqlite3
 import json
-from typing import List, Tuple
-from utils import slugify
+from typing import Dict, List, Optional, Tuple
+from card_store import MEDIA_DIR, StoredCard, StoredDeck, compile_store, load_cards, load_decks, media_sha1
 
 # --- CONFIGURATION ---
 SCRIPT_PATH = os.path.realpath(__file__)
 SCRIPT_DIR = os.path.dirname(SCRIPT_PATH)
 BASE_DIR = os.path.dirname(SCRIPT_DIR)
 
-DECKS_DIR = os.path.join(BASE_DIR, "decks")
-MEDIA_DIR = os.path.join(BASE_DIR, "media")
 OUTPUT_DIR = os.path.join(BASE_DIR, "docs")
 PREVIEWS_DIR = os.path.join(OUTPUT_DIR, "previews")
 OUT_MEDIA_DIR = os.path.join(OUTPUT_DIR, "media")
@@ -25,16 +23,27 @@ OUT_APKG_DIR = os.path.join(OUTPUT_DIR, "decks")
 
 # --- ANKI MODEL ---
 MODEL_ID = 1607392319
-PTSI_MODEL = genanki.Model(
-    MODEL_ID,
-    'PTSI Modele Simple',
-    fields=[{'name': 'Question'}, {'name': 'Reponse'}],
-    templates=[{
-        'name': 'Carte 1',
-        'qfmt': '{{Question}}',
-        'afmt': '{{FrontSide}}<hr id="answer">{{Reponse}}',
-    }]
-)
+_PTSI_MODEL = None
+
+def get_ptsi_model() -> "genanki.Model":
+    """
+    Retourne le modèle Anki des decks PTSI.
+    genanki n'est importé qu'ici, pour que les exécutions sans paquet à générer restent rapides.
+    """
+    global _PTSI_MODEL
+    if _PTSI_MODEL is None:
+        import genanki
+        _PTSI_MODEL = genanki.Model(
+            MODEL_ID,
+            'PTSI Modele Simple',
+            fields=[{'name': 'Question'}, {'name': 'Reponse'}],
+            templates=[{
+                'name': 'Carte 1',
+                'qfmt': '{{Question}}',
+                'afmt': '{{FrontSide}}<hr id="answer">{{Reponse}}',
+            }]
+        )
+    return _PTSI_MODEL
 
 def get_unique_deck_id(deck_name: str) -> int:
     """Génère un ID unique pour le deck basé sur son nom."""
@@ -53,113 +62,64 @@ def clean_deck_name(base_name: str, subject_folder: str) -> str:
     
     return base_name
 
-def extract_media_refs(text: str) -> List[str]:
-    """Extrait les références d'images src="..."."""
-    return re.findall(r'src="([^"]+)"', text)
+def find_media_files(cards: List[StoredCard]) -> List[str]:
+    """Liste les images des cartes (sans doublon) et signale celles introuvables."""
+    media_files = []
 
-def clean_media_paths(text: str) -> str:
-    """Nettoie les chemins d'images pour Anki."""
-    # Transforme <img src="../media/si/photo.jpg"> en <img src="photo.jpg">
-    return re.sub(r'src="[^"]*/([^"/]+)"', r'src="\1"', text)
+    for card in cards:
+        for name, path in card.media:
+            if path is None:
+                print(f"      ⚠️ Image manquante : {name} (introuvable dans media/)")
+            elif path not in media_files:
+                media_files.append(path)
 
-def process_csv_rows(csv_path: str) -> Tuple[List[genanki.Note], List[str]]:
-    """Lit un fichier CSV et génère des notes."""
-    notes = []
-    media_refs = []
-    
-    try:
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-            for row in reader:
-                if len(row) < 2:
-                    continue
-                
-                front, back = row[0], row[1]
-                # Clean quoted quotes
-                front = front.replace('""', '"').strip('"')
-                back = back.replace('""', '"').strip('"')
-                
-                # Collect media references BEFORE cleaning paths
-                media_refs.extend(extract_media_refs(front + back))
-                
-                # Clean paths for Anki
-                front = clean_media_paths(front)
-                back = clean_media_paths(back)
-                
-                note = genanki.Note(model=PTSI_MODEL, fields=[front, back])
-                notes.append(note)
-                
-    except Exception as e:
-        print(f"   ❌ Erreur lecture CSV {os.path.basename(csv_path)}: {e}")
-        return [], []
-        
-    return notes, media_refs
+    return media_files
+
+def deck_output_names(stored_deck: StoredDeck) -> Tuple[str, str]:
+    """Retourne le nom du deck Anki et le nom du fichier .apkg d'un CSV."""
+    clean_name = clean_deck_name(stored_deck.base_name, stored_deck.subject)
+    deck_name = f"{stored_deck.subject}::{clean_name.replace('_', ' ')}"
+    return deck_name, f"{stored_deck.subject}-{clean_name}.apkg"
 
-def find_media_files(media_refs: List[str], media_subfolder: str) -> List[str]:
-    """Trouve les fichiers images correspondants dans media/."""
-    create_package_media = []
+def build_package(deck_name: str, cards: List[StoredCard]) -> "genanki.Package":
+    """Construit le paquet Anki (notes + images) d'une liste de cartes compilées."""
+    import genanki
     
-    for img_ref in media_refs:
-        img_name = os.path.basename(img_ref)
-        full_img_path = os.path.join(MEDIA_DIR, media_subfolder, img_name)
+    model = get_ptsi_model()
+    deck = genanki.Deck(get_unique_deck_id(deck_name), deck_name)
+    for card in cards:
+        deck.add_note(genanki.Note(model=model, fields=[card.front, card.back]))
         
-        if os.path.exists(full_img_path):
-            if full_img_path not in create_package_media:
-                create_package_media.append(full_img_path)
-        else:
-            # Fallback direct search in media/
-            found_path = None
-            for root, _, files in os.walk(MEDIA_DIR):
-                if img_name in files:
-                    found_path = os.path.join(root, img_name)
-                    break
-            
-            if found_path:
-                if found_path not in create_package_media:
-                    create_package_media.append(found_path)
-            else:
-                print(f"      ⚠️ Image manquante : {img_name} (introuvable dans media/)")
-                
-    return create_package_media
+    package = genanki.Package(deck)
+    package.media_files = find_media_files(cards)
+    return package
 
-def generate_deck_package(csv_path: str, subject_folder: str) -> Tuple[bool, int, str]:
-    """Génère un paquet .apkg à partir d'un fichier CSV."""
-    filename = os.path.basename(csv_path)
-    base_name = filename.replace('.csv', '')
-    
-    clean_name = clean_deck_name(base_name, subject_folder)
-    deck_name = f"{subject_folder}::{clean_name.replace('_', ' ')}"
-    output_filename = f"{subject_folder}-{clean_name}.apkg"
-    
-    # Media subfolder relies on the last part of the deck name
-    last_part = deck_name.split('::')[-1]
-    media_subfolder = slugify(last_part)
+def generate_deck_package(stored_deck: StoredDeck, cards: List[StoredCard]) -> Tuple[bool, int, str]:
+    """Génère un paquet .apkg à partir des cartes compilées d'un fichier CSV."""
+    filename = os.path.basename(stored_deck.path)
+    deck_name, output_filename = deck_output_names(stored_deck)
     
     print(f"🔨 Traitement : {filename}")
     print(f"   📦 Deck Anki : {deck_name}")
     
-    notes, media_refs = process_csv_rows(csv_path)
-    if not notes:
+    if not cards:
         return False, 0, output_filename
 
-    deck = genanki.Deck(get_unique_deck_id(deck_name), deck_name)
-    for note in notes:
-        deck.add_note(note)
-        
-    media_files = find_media_files(media_refs, media_subfolder)
+    package = build_package(deck_name, cards)
+    media_files = package.media_files
     
     # Copy media files to docs/media for previews
     for m_file in media_files:
         dest = os.path.join(OUT_MEDIA_DIR, os.path.basename(m_file))
-        if not os.path.exists(dest):
+        if not os.path.exists(dest) or not filecmp.cmp(m_file, dest, shallow=False):
             shutil.copy2(m_file, dest)
             
     # Generate JSON preview data
     preview_notes = []
-    for note in notes:
+    for card in cards:
         # replace src="img.jpg" with src="media/img.jpg" for the web preview
-        front_html = note.fields[0].replace('src="', 'src="media/').replace("src='", "src='media/")
-        back_html = note.fields[1].replace('src="', 'src="media/').replace("src='", "src='media/")
+        front_html = card.front.replace('src="', 'src="media/').replace("src='", "src='media/")
+        back_html = card.back.replace('src="', 'src="media/').replace("src='", "src='media/")
         preview_notes.append({"front": front_html, "back": back_html})
         
     preview_path = os.path.join(PREVIEWS_DIR, output_filename.replace('.apkg', '.json'))
@@ -171,74 +131,124 @@ def generate_deck_package(csv_path: str, subject_folder: str) -> Tuple[bool, int
     
     # Save package
     output_path = os.path.join(OUT_APKG_DIR, output_filename)
-    package = genanki.Package(deck)
-    package.media_files = media_files
     
     try:
         package.write_to_file(output_path)
-        print(f"   ✅ Créé : {len(notes)} cartes, {len(media_files)} images, 1 preview")
+        print(f"   ✅ Créé : {len(cards)} cartes, {len(media_files)} images, 1 preview")
         print()
-        return True, len(notes), output_filename
+        return True, len(cards), output_filename
     except Exception as e:
         print(f"   ❌ Erreur écriture .apkg : {e}")
         return False, 0, output_filename
 
-def main() -> None:
-    print("="*60)
-    print("🚀 GÉNÉRATION DES PAQUETS ANKI (.apkg)")
-    print("="*60)
-    print()
-    
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-    if not os.path.exists(PREVIEWS_DIR):
-        os.makedirs(PREVIEWS_DIR)
-    if not os.path.exists(OUT_MEDIA_DIR):
-        os.makedirs(OUT_MEDIA_DIR)
-    if not os.path.exists(OUT_APKG_DIR):
-        os.makedirs(OUT_APKG_DIR)
+def deck_input_hash(conn: sqlite3.Connection, stored_deck: StoredDeck, cards: List[StoredCard]) -> str:
+    """
+    Empreinte des données d'un paquet : le CSV et le contenu de ses images.
+    Les chemins sont relatifs à media/, pour que apkg_meta.json ne dépende pas
+    de l'emplacement du dépôt. Le SHA-1 des images est mis en cache dans la base.
+    """
+    parts = [stored_deck.sha1]
+    for name, path in sorted({m for card in cards for m in card.media}, key=lambda m: (m[0], m[1] or '')):
+        if path is None:
+            parts.append(f"{name}:missing")
+            continue
+        parts.append(f"{os.path.relpath(path, MEDIA_DIR).replace(os.sep, '/')}:{media_sha1(conn, path)}")
+    return hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest()
+
+def is_up_to_date(output_filename: str, input_hash: str, apkg_meta: Dict[str, Dict],
+                  cards: List[StoredCard]) -> bool:
+    """
+    Vérifie que le paquet, l'aperçu et les images copiées dans docs/media existent
+    et ont été générés à partir des mêmes données.
+    """
+    media_names = {name for card in cards for name, path in card.media if path}
+    return (apkg_meta.get(output_filename, {}).get('sha1') == input_hash
+            and os.path.exists(os.path.join(OUT_APKG_DIR, output_filename))
+            and os.path.exists(os.path.join(PREVIEWS_DIR, output_filename.replace('.apkg', '.json')))
+            and all(os.path.exists(os.path.join(OUT_MEDIA_DIR, name)) for name in media_names))
+
+def build_packages(selected: Optional[List[str]] = None, force: bool = False) -> Dict[str, int]:
+    """
+    Génère les paquets des decks (tous, ou ceux dont le chemin est dans `selected`).
+    Les decks dont le CSV et les images n'ont pas changé depuis la dernière génération
+    sont ignorés, sauf avec `force`.
+    """
+    for directory in (OUTPUT_DIR, PREVIEWS_DIR, OUT_MEDIA_DIR, OUT_APKG_DIR):
+        os.makedirs(directory, exist_ok=True)
         
-    stats = {'processed': 0, 'success': 0, 'errors': 0}
-    apkg_meta = {}
+    stats = {'processed': 0, 'success': 0, 'skipped': 0, 'errors': 0}
     
-    for root, _, files in os.walk(DECKS_DIR):
-        relative_path = os.path.relpath(root, DECKS_DIR)
+    meta_path = os.path.join(OUTPUT_DIR, 'apkg_meta.json')
+    apkg_meta: Dict[str, Dict] = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            apkg_meta = json.load(f)
+    
+    conn = compile_store()
+    all_decks = load_decks(conn)
+    
+    # Forget packages whose CSV no longer exists
+    known_outputs = {deck_output_names(d)[1] for d in all_decks}
+    apkg_meta = {name: meta for name, meta in apkg_meta.items() if name in known_outputs}
+    
+    decks_by_subject: Dict[str, List[StoredDeck]] = {}
+    for stored_deck in all_decks:
+        if selected is None or stored_deck.path in selected:
+            decks_by_subject.setdefault(stored_deck.subject, []).append(stored_deck)
+    
+    for subject_folder, stored_decks in decks_by_subject.items():
+        print(f"📁 Matière : {subject_folder} ({len(stored_decks)} fichier(s))")
+        print()
         
-        if relative_path == '.':
-            subject_folder = 'Divers'
-        else:
-            subject_folder = relative_path.split(os.sep)[0]
+        for stored_deck in stored_decks:
+            stats['processed'] += 1
+            output_filename = deck_output_names(stored_deck)[1]
+            cards = load_cards(conn, [stored_deck.id])
+            input_hash = deck_input_hash(conn, stored_deck, cards)
             
-        csv_files = [f for f in files if f.endswith('.csv')]
-        
-        if csv_files:
-            print(f"📁 Matière : {subject_folder} ({len(csv_files)} fichier(s))")
-            print()
+            if not force and is_up_to_date(output_filename, input_hash, apkg_meta, cards):
+                stats['skipped'] += 1
+                continue
             
-            for csv_file in csv_files:
-                stats['processed'] += 1
-                csv_path = os.path.join(root, csv_file)
+            success, card_count, out_name = generate_deck_package(stored_deck, cards)
+            if success:
+                stats['success'] += 1
+                apkg_meta[out_name] = {'cards': card_count, 'sha1': input_hash}
+            else:
+                stats['errors'] += 1
+                apkg_meta.pop(out_name, None)
                 
-                success, card_count, out_name = generate_deck_package(csv_path, subject_folder)
-                if success:
-                    stats['success'] += 1
-                    apkg_meta[out_name] = {'cards': card_count}
-                else:
-                    stats['errors'] += 1
+    conn.close()
                     
     # Save meta json
-    with open(os.path.join(OUTPUT_DIR, 'apkg_meta.json'), 'w', encoding='utf-8') as f:
+    with open(meta_path, 'w', encoding='utf-8') as f:
         json.dump(apkg_meta, f, ensure_ascii=False, indent=2)
+        
+    return stats
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build .apkg packages and previews from decks/.")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every package, even if its CSV did not change")
+    args = parser.parse_args()
+    
+    print("="*60)
+    print("🚀 GÉNÉRATION DES PAQUETS ANKI (.apkg)")
+    print("="*60)
+    print()
+    
+    stats = build_packages(force=args.force)
                     
     print("="*60)
     print(f"✨ RÉSUMÉ")
     print("="*60)
     print(f"📊 Fichiers traités : {stats['processed']}")
     print(f"✅ Succès : {stats['success']}")
+    print(f"⏭️  Inchangés : {stats['skipped']}")
     print(f"❌ Erreurs : {stats['errors']}")
     print()
     
-    if stats['success'] == 0 and stats['processed'] > 0:
+    if stats['success'] == 0 and stats['skipped'] == 0 and stats['processed'] > 0:
         print("⚠️ Aucun paquet généré.")
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
 import json
 import os
 from datetime import date
@@ -8,14 +9,23 @@ from urllib.parse import quote
 from pathlib import Path
 from typing import Dict, List, Any
 from jinja2 import Environment, FileSystemLoader
+from card_store import file_sha1
+from utils import slugify
 
 # --- CONFIGURATION ---
 SCRIPT_PATH = Path(__file__).resolve()
 BASE_DIR = SCRIPT_PATH.parent.parent
 OUTPUT_DIR = BASE_DIR / "docs"
+SUBJECTS_DIR = OUTPUT_DIR / "subjects"
 
 BASE_URL = "https://cermp.github.io/anki-ptsi/"
 
+# Offline cache (docs/sw.js): page assets are precached at install,
+# previews and images only once a deck has been viewed. .apkg downloads are not cached.
+PRECACHE_MANIFEST = "precache-manifest.json"
+PRECACHE_PATTERNS = ["*.html", "decks.json", "subjects/*.json", "css/*", "js/*", "assets/*"]
+ON_DEMAND_PATTERNS = ["previews/*.json", "media/**/*"]
+
 def get_file_size_str(filepath: Path) -> str:
     """Retourne la taille du fichier formatée (KB/MB)."""
     size_bytes = filepath.stat().st_size
@@ -23,7 +33,7 @@ def get_file_size_str(filepath: Path) -> str:
         return f"{size_bytes / 1024:.1f} KB"
     return f"{size_bytes / (1024 * 1024):.1f} MB"
 
-def collect_decks_info() -> Dict[str, List[Dict[str, str]]]:
+def collect_decks_info() -> Dict[str, List[Dict[str, Any]]]:
     """Parcourt le dossier docs/ pour trouver les fichiers .apkg."""
     decks_by_subject = {}
     
@@ -73,17 +83,60 @@ def collect_decks_info() -> Dict[str, List[Dict[str, str]]]:
         
     return decks_by_subject
 
-def save_json(data: Dict[str, List[Dict[str, str]]]) -> None:
-    """Sauvegarde les données dans decks.json."""
+def build_subjects_index(data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Résume chaque matière (nombre de decks et de cartes, fichier JSON associé)."""
+    subjects = []
+    for subject, decks in sorted(data.items()):
+        slug = slugify(subject)
+        subjects.append({
+            'name': subject,
+            'slug': slug,
+            'decks': len(decks),
+            'cards': sum(deck.get('cards', 0) for deck in decks),
+            'url': f"subjects/{slug}.json"
+        })
+        
+    return {
+        'total_decks': sum(s['decks'] for s in subjects),
+        'total_cards': sum(s['cards'] for s in subjects),
+        'total_subjects': len(subjects),
+        'subjects': subjects
+    }
+
+def save_json(data: Dict[str, List[Dict[str, Any]]], index: Dict[str, Any]) -> None:
+    """
+    Sauvegarde l'index des matières dans decks.json et les decks de chaque
+    matière dans subjects/<matière>.json, chargés à la demande par decks.html.
+    """
     json_path = OUTPUT_DIR / 'decks.json'
     try:
+        SUBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+        
+        written = set()
+        for subject in index['subjects']:
+            chunk = [
+                dict(deck,
+                     id=f"deck-{Path(deck['filename']).stem}",
+                     preview=f"previews/{quote(Path(deck['filename']).stem)}.json")
+                for deck in data[subject['name']]
+            ]
+            chunk_path = OUTPUT_DIR / subject['url']
+            with open(chunk_path, 'w', encoding='utf-8') as f:
+                json.dump(chunk, f, ensure_ascii=False, separators=(',', ':'))
+            written.add(chunk_path.name)
+            
+        # Remove chunks of subjects that no longer exist
+        for stale in SUBJECTS_DIR.glob("*.json"):
+            if stale.name not in written:
+                stale.unlink()
+                
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"✅ JSON créé : {json_path.name}")
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        print(f"✅ JSON créé : {json_path.name} + {len(written)} matière(s) dans {SUBJECTS_DIR.name}/")
     except Exception as e:
         print(f"❌ Erreur JSON : {e}")
 
-def save_sitemap(data: Dict[str, List[Dict[str, str]]]) -> None:
+def save_sitemap(data: Dict[str, List[Dict[str, Any]]]) -> None:
     """Génère le sitemap.xml."""
     today = date.today().isoformat()
     
@@ -122,20 +175,62 @@ def save_sitemap(data: Dict[str, List[Dict[str, str]]]) -> None:
     except Exception as e:
         print(f"❌ Erreur Sitemap : {e}")
 
-def save_html(data: Dict[str, List[Dict[str, str]]]) -> None:
-    """Génère et sauvegarde le fichier decks.html via Jinja2."""
-    total_decks = sum(len(d) for d in data.values()) if data else 0
-    total_subjects = len(data) if data else 0
-    total_cards = sum(deck.get('cards', 0) for d in data.values() for deck in d) if data else 0
-    
+def build_precache_manifest(root: Path = OUTPUT_DIR) -> Dict[str, Any]:
+    """
+    Liste les fichiers du site mis en cache par le service worker, avec leur
+    empreinte et leur taille. La version change dès qu'un fichier change.
+    """
+    assets = {}
+    for patterns, precache in ((PRECACHE_PATTERNS, True), (ON_DEMAND_PATTERNS, False)):
+        for pattern in patterns:
+            for filepath in root.glob(pattern):
+                url = filepath.relative_to(root).as_posix()
+                if filepath.is_file() and url not in assets:
+                    assets[url] = {
+                        'url': url,
+                        'hash': file_sha1(filepath),
+                        'size': filepath.stat().st_size,
+                        'precache': precache
+                    }
+
+    entries = [assets[url] for url in sorted(assets)]
+    version = hashlib.sha1(json.dumps(entries, sort_keys=True).encode('utf-8')).hexdigest()
+    return {'version': version, 'assets': entries}
+
+def save_precache(manifest: Dict[str, Any]) -> None:
+    """Sauvegarde le manifeste de précache et le service worker qui l'utilise."""
+    manifest_path = OUTPUT_DIR / PRECACHE_MANIFEST
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    # The version is written into sw.js so browsers notice a new deploy and reinstall it
+    env = Environment(loader=FileSystemLoader(str(SCRIPT_PATH.parent / 'templates')))
+    sw_content = env.get_template('sw_template.js').render(
+        version=manifest['version'],
+        manifest_url=PRECACHE_MANIFEST
+    )
+    with open(OUTPUT_DIR / 'sw.js', 'w', encoding='utf-8') as f:
+        f.write(sw_content)
+
+    total = sum(a['size'] for a in manifest['assets'])
+    precached = sum(a['size'] for a in manifest['assets'] if a['precache'])
+    print(f"✅ Précache créé : {manifest_path.name} ({len(manifest['assets'])} fichiers, "
+          f"{precached / 1024:.0f} KB à l'installation, {total / 1024:.0f} KB au total)")
+
+def save_html(index: Dict[str, Any]) -> None:
+    """
+    Génère et sauvegarde le fichier decks.html via Jinja2.
+    La page ne contient que l'en-tête de chaque matière : les decks sont
+    chargés et affichés par js/main.js.
+    """
     env = Environment(loader=FileSystemLoader(str(SCRIPT_PATH.parent / 'templates')))
     template = env.get_template('decks_template.html')
     
     html_content = template.render(
-        data=data,
-        total_decks=total_decks,
-        total_subjects=total_subjects,
-        total_cards=total_cards
+        subjects=index['subjects'],
+        total_decks=index['total_decks'],
+        total_subjects=index['total_subjects'],
+        total_cards=index['total_cards']
     )
     
     html_path = OUTPUT_DIR / 'decks.html'
@@ -155,10 +250,13 @@ def main() -> None:
         OUTPUT_DIR.mkdir(parents=True)
         
     decks = collect_decks_info()
+    index = build_subjects_index(decks)
     
-    save_json(decks)
-    save_html(decks)
+    save_json(decks, index)
+    save_html(index)
     save_sitemap(decks)
+    # Last, so the manifest hashes the files written above
+    save_precache(build_precache_manifest())
     
     print("\n" + "="*60)
     print("Terminé.")
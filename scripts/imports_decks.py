@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import csv
 import os
-import re
-import sys
 import base64
-from typing import List, Dict, Any, Optional
+import argparse
+import queue
+import threading
+import time
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 from utils import anki_connect_request
+from card_store import StoredCard, compile_store, find_deck, index_media, load_cards, parse_csv
 
 # --- CONFIGURATION ---
 SCRIPT_PATH = os.path.realpath(__file__)
@@ -15,7 +17,12 @@ SCRIPT_DIR = os.path.dirname(SCRIPT_PATH)
 BASE_DIR = os.path.dirname(SCRIPT_DIR)
 
 DECKS_DIR = os.path.join(BASE_DIR, "decks")
-MEDIA_DIR = os.path.join(BASE_DIR, "media")
+
+# Import pipeline limits
+DEFAULT_MEDIA_WORKERS = 4
+DEFAULT_SENDERS = 2
+CHUNK_MAX_NOTES = 200
+CHUNK_MAX_BYTES = 512 * 1024
 
 def get_anki_model() -> Optional[str]:
     """Récupère le premier modèle disponible."""
@@ -47,116 +54,276 @@ def get_model_fields(model_name: str) -> Optional[List[str]]:
     print(f"  ❌ Impossible de récupérer les champs de {model_name}")
     return None
 
-def store_media_file(filename: str, subfolder: str) -> bool:
+def store_media_file(filename: str, filepath: str) -> bool:
     """Envoie un fichier média à Anki."""
-    # Check in subfolder first, then root
-    filepath = os.path.join(MEDIA_DIR, subfolder, filename)
-    if not os.path.exists(filepath):
-        filepath = os.path.join(MEDIA_DIR, filename)
-        if not os.path.exists(filepath):
-            return False
-            
     try:
         with open(filepath, 'rb') as f:
             data = base64.b64encode(f.read()).decode('utf-8')
             
-        anki_connect_request("storeMediaFile", filename=filename, data=data)
-        return True
+        return anki_connect_request("storeMediaFile", filename=filename, data=data) is not None
     except Exception:
         return False
 
-def process_text_images(text: str, subfolder: str) -> str:
+def deck_target(csv_path: str) -> Tuple[str, str]:
+    """Retourne (nom du deck Anki, sous-dossier de media/ supposé) pour un fichier CSV."""
+    filename = os.path.basename(csv_path)
+    deck_name = filename.replace('.csv', '').replace('-', '::').replace('_', ' ')
+    
+    # Guess media subfolder from filename
+    subfolder = filename.replace('.csv', '').lower().replace(" ", "_").replace("-", "_")
+    return deck_name, subfolder
+
+def build_note(card: StoredCard, deck_name: str, model_name: str, fields: List[str]) -> Dict[str, Any]:
+    """Note AnkiConnect (addNotes) pour une carte."""
+    return {
+        "deckName": deck_name,
+        "modelName": model_name,
+        "fields": {
+            fields[0]: card.front,
+            fields[1]: card.back
+        },
+        "tags": card.tags,
+        "options": {
+            "allowDuplicate": False,
+            "duplicateScope": "deck"
+        }
+    }
+
+# --- PIPELINE ---
+
+class NoteChunk(NamedTuple):
+    path: str
+    deck_name: str
+    notes: List[Dict[str, Any]]
+    size: int
+
+class StageStats:
+    """Temps de travail et d'attente d'une étape du pipeline, cumulés sur ses threads."""
+
+    def __init__(self, name: str, threads: int) -> None:
+        self.name = name
+        self.threads = threads
+        self.busy = 0.0
+        self.wait = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def record(self, busy: float = 0.0, wait: float = 0.0, items: int = 0) -> None:
+        with self._lock:
+            self.busy += busy
+            self.wait += wait
+            self.items += items
+
+class ImportReport(NamedTuple):
+    files: List[Dict[str, Any]]
+    cards: int
+    added: int
+    media: int
+    media_errors: int
+    bytes_sent: int
+    elapsed: float
+    stages: List[StageStats]
+
+class ImportPipeline:
     """
-    1. Trouve les images src="..." dans le texte.
-    2. Les envoie à Anki.
-    3. Retroune le texte avec les chemins corrigés pour Anki (src="image.jpg").
+    Importe des fichiers CSV en étapes qui se chevauchent :
+    - lecture des fichiers (thread appelant) ;
+    - envoi des médias (`media_workers` threads), chaque fichier une seule fois ;
+    - envoi des notes par paquets addNotes bornés en nombre et en octets (`senders` threads).
+    Les files entre étapes sont bornées : si Anki ralentit, la lecture attend
+    au lieu d'accumuler toutes les notes en mémoire.
     """
-    # Clean quotes
-    text = text.replace('""', '"')
-    
-    # Extract images
-    # Supports <img src="../media/sub/image.jpg"> and src="image.jpg"
-    matches = re.findall(r'src="([^"]+)"', text)
-    
-    for match in matches:
-        if match.startswith('http'):
-            continue
-            
-        filename = os.path.basename(match)
-        store_media_file(filename, subfolder)
-        
-    # Fix paths for Anki: src="../media/sub/image.jpg" -> src="image.jpg"
-    text = re.sub(r'src="[^"]*/([^"/]+)"', r'src="\1"', text)
-    
-    return text
 
-def parse_csv_file(csv_path: str, deck_name: str, subfolder: str, model_name: str, fields: List[str]) -> List[Dict[str, Any]]:
-    """Lit le CSV et retourne une liste de notes pour Anki."""
-    notes = []
-    
-    try:
-        with open(csv_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-            
-            for row in reader:
-                if len(row) < 2: 
-                    continue
-                    
-                front = row[0].strip()
-                back = row[1].strip()
-                tags = row[2].strip().split() if len(row) > 2 else []
-                
-                # Process images
-                front = process_text_images(front, subfolder)
-                back = process_text_images(back, subfolder)
+    def __init__(self, model_name: str, field_names: List[str],
+                 media_workers: int = DEFAULT_MEDIA_WORKERS, senders: int = DEFAULT_SENDERS,
+                 chunk_notes: int = CHUNK_MAX_NOTES, chunk_bytes: int = CHUNK_MAX_BYTES) -> None:
+        self.model_name = model_name
+        self.field_names = field_names
+        self.media_workers = max(1, media_workers)
+        self.senders = max(1, senders)
+        self.chunk_notes = chunk_notes
+        self.chunk_bytes = chunk_bytes
+
+        self.parse_stats = StageStats("lecture", 1)
+        self.media_stats = StageStats("médias", self.media_workers)
+        self.notes_stats = StageStats("notes", self.senders)
+
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._created_decks: set = set()
+        self._deck_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._media_errors = 0
+        self._bytes_sent = 0
+
+    def run(self, paths: List[str]) -> ImportReport:
+        start = time.perf_counter()
+        media_queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue(maxsize=self.media_workers * 4)
+        note_queue: "queue.Queue[Optional[NoteChunk]]" = queue.Queue(maxsize=self.senders * 2)
+
+        workers = [threading.Thread(target=self._upload_media, args=(media_queue,), daemon=True)
+                   for _ in range(self.media_workers)]
+        workers += [threading.Thread(target=self._send_notes, args=(note_queue,), daemon=True)
+                    for _ in range(self.senders)]
+        for worker in workers:
+            worker.start()
+
+        try:
+            self._parse(paths, media_queue, note_queue)
+        finally:
+            # One stop marker per worker, after all the real work
+            for _ in range(self.media_workers):
+                media_queue.put(None)
+            for _ in range(self.senders):
+                note_queue.put(None)
+            for worker in workers:
+                worker.join()
+
+        files = [self._files[path] for path in paths if path in self._files]
+        return ImportReport(
+            files=files,
+            cards=sum(f['cards'] for f in files),
+            added=sum(f['added'] for f in files),
+            media=self.media_stats.items,
+            media_errors=self._media_errors,
+            bytes_sent=self._bytes_sent,
+            elapsed=time.perf_counter() - start,
+            stages=[self.parse_stats, self.media_stats, self.notes_stats]
+        )
+
+    def _put(self, q: queue.Queue, item: Any) -> float:
+        """Ajoute `item` à la file et retourne le temps passé à attendre une place."""
+        started = time.perf_counter()
+        q.put(item)
+        return time.perf_counter() - started
+
+    def _parse(self, paths: List[str], media_queue: queue.Queue, note_queue: queue.Queue) -> None:
+        conn = compile_store()
+        media_index = None
+        queued_media = set()
+        
+        try:
+            for path in paths:
+                started = time.perf_counter()
+                waited = 0.0
+                deck_name, subfolder = deck_target(path)
+                info = self._files[path] = {'path': path, 'deck': deck_name, 'cards': 0, 'added': 0, 'error': None}
                 
-                if not front and not back:
+                try:
+                    stored_deck = find_deck(conn, path)
+                    if stored_deck:
+                        cards = load_cards(conn, [stored_deck.id])
+                    else:
+                        if media_index is None:
+                            media_index = index_media()
+                        cards = parse_csv(path, subfolder, media_index)
+                except Exception as e:
+                    info['error'] = f"Erreur CSV : {e}"
                     continue
-                    
-                note = {
-                    "deckName": deck_name,
-                    "modelName": model_name,
-                    "fields": {
-                        fields[0]: front,
-                        fields[1]: back
-                    },
-                    "tags": tags,
-                    "options": {
-                        "allowDuplicate": False,
-                        "duplicateScope": "deck"
-                    }
-                }
-                notes.append(note)
+                info['cards'] = len(cards)
                 
-    except Exception as e:
-        print(f"    ❌ Erreur CSV {os.path.basename(csv_path)}: {e}")
-        return []
-        
-    return notes
+                notes: List[Dict[str, Any]] = []
+                size = 0
+                for card in cards:
+                    for filename, filepath in card.media:
+                        if filepath and filename not in queued_media:
+                            queued_media.add(filename)
+                            waited += self._put(media_queue, (filename, filepath))
+                            
+                    note_size = len(card.front.encode('utf-8')) + len(card.back.encode('utf-8')) + len(" ".join(card.tags))
+                    if notes and (len(notes) >= self.chunk_notes or size + note_size > self.chunk_bytes):
+                        waited += self._put(note_queue, NoteChunk(path, deck_name, notes, size))
+                        notes, size = [], 0
+                    notes.append(build_note(card, deck_name, self.model_name, self.field_names))
+                    size += note_size
+                    
+                if notes:
+                    waited += self._put(note_queue, NoteChunk(path, deck_name, notes, size))
+                self.parse_stats.record(busy=time.perf_counter() - started - waited, wait=waited, items=len(cards))
+        finally:
+            conn.close()
+
+    def _upload_media(self, media_queue: queue.Queue) -> None:
+        while True:
+            started = time.perf_counter()
+            item = media_queue.get()
+            waited = time.perf_counter() - started
+            if item is None:
+                self.media_stats.record(wait=waited)
+                return
+            
+            filename, filepath = item
+            started = time.perf_counter()
+            ok = store_media_file(filename, filepath)
+            with self._lock:
+                if ok:
+                    self._bytes_sent += os.path.getsize(filepath)
+                else:
+                    self._media_errors += 1
+            self.media_stats.record(busy=time.perf_counter() - started, wait=waited, items=1 if ok else 0)
+
+    def _ensure_deck(self, deck_name: str) -> bool:
+        """Crée le deck une seule fois ; un échec sera retenté par le paquet suivant."""
+        with self._deck_lock:
+            if deck_name not in self._created_decks:
+                if not anki_connect_request("createDeck", deck=deck_name):
+                    return False
+                self._created_decks.add(deck_name)
+            return True
+
+    def _send_notes(self, note_queue: queue.Queue) -> None:
+        while True:
+            started = time.perf_counter()
+            chunk = note_queue.get()
+            waited = time.perf_counter() - started
+            if chunk is None:
+                self.notes_stats.record(wait=waited)
+                return
+            
+            started = time.perf_counter()
+            error = None
+            try:
+                if self._ensure_deck(chunk.deck_name):
+                    response = anki_connect_request("addNotes", notes=chunk.notes)
+                    added = len([r for r in response.get("result") or [] if r is not None]) if response else 0
+                else:
+                    added = 0
+                    error = f"Création du deck '{chunk.deck_name}' impossible"
+            except Exception:
+                added = 0
+            with self._lock:
+                info = self._files[chunk.path]
+                info['added'] += added
+                if error and not info['error']:
+                    info['error'] = error
+                self._bytes_sent += chunk.size
+            self.notes_stats.record(busy=time.perf_counter() - started, wait=waited, items=len(chunk.notes))
 
-def import_file(csv_path: str, model_name: str, field_names: List[str]) -> None:
+def print_import_report(report: ImportReport) -> None:
+    """Affiche le résultat par fichier, le débit et les temps d'attente de chaque étape."""
+    for info in report.files:
+        print(f"📥 {os.path.basename(info['path'])} -> '{info['deck']}'")
+        if info['error']:
+            print(f"   ❌ {info['error']}")
+        elif info['cards']:
+            print(f"   ✅ {info['added']} cartes importées.")
+        else:
+            print("   ⚠️  Aucune carte importée.")
+            
+    elapsed = max(report.elapsed, 1e-9)
+    print(f"\n📊 {report.cards} cartes ({report.added} ajoutées), {report.media} médias"
+          f"{f' ({report.media_errors} en erreur)' if report.media_errors else ''} en {report.elapsed:.2f} s")
+    print(f"   {report.cards / elapsed:,.0f} cartes/s, {report.bytes_sent / elapsed / 1024:,.0f} KB/s")
+    print("⏳ Étapes (secondes cumulées sur les threads) :")
+    for stage in report.stages:
+        # Reading waits on full queues (Anki is the bottleneck), senders wait on empty ones
+        print(f"   {stage.name:<8} ×{stage.threads}  travail {stage.busy:6.2f} s | attente {stage.wait:6.2f} s")
+
+def import_file(csv_path: str, model_name: str, field_names: List[str]) -> ImportReport:
     """Importe un fichier CSV spécifique."""
-    filename = os.path.basename(csv_path)
-    deck_name = filename.replace('.csv', '').replace('-', '::').replace('_', ' ')
-    
-    # Guess media subfolder from filename
-    subfolder = filename.replace('.csv', '').lower().replace(" ", "_").replace("-", "_")
-    
-    print(f"\n📥 Import de '{filename}' vers '{deck_name}'...")
-    
-    # Create deck if needed
-    anki_connect_request("createDeck", deck=deck_name)
-    
-    notes = parse_csv_file(csv_path, deck_name, subfolder, model_name, field_names)
-    
-    if notes:
-        response = anki_connect_request("addNotes", notes=notes)
-        added = len([r for r in response.get("result", []) if r is not None]) if response else 0
-        print(f"   ✅ {added} cartes importées.")
-    else:
-        print("   ⚠️  Aucune carte importée.")
+    return import_files([csv_path], model_name, field_names)
 
-def interactive_mode(model_name: str, field_names: List[str]) -> None:
+def interactive_mode(model_name: str, field_names: List[str],
+                     media_workers: int = DEFAULT_MEDIA_WORKERS, senders: int = DEFAULT_SENDERS) -> None:
     """Mode interactif pour choisir les fichiers."""
     csv_files = []
     for root, _, files in os.walk(DECKS_DIR):
@@ -189,33 +356,57 @@ def interactive_mode(model_name: str, field_names: List[str]) -> None:
             print("[ERREUR] Saisie invalide.")
             return
 
-    print(f"\n🚀 Début de l'import pour {len(to_import)} fichier(s)...\n")
-    for path in to_import:
-        import_file(path, model_name, field_names)
+    import_files(to_import, model_name, field_names, media_workers, senders)
 
-def main() -> None:
-    # Check connection
+def import_files(paths: List[str], model_name: str, field_names: List[str],
+                 media_workers: int = DEFAULT_MEDIA_WORKERS, senders: int = DEFAULT_SENDERS) -> ImportReport:
+    """Importe une liste de fichiers CSV via le pipeline et affiche le résumé."""
+    print(f"\n🚀 Début de l'import pour {len(paths)} fichier(s)...\n")
+    report = ImportPipeline(model_name, field_names, media_workers, senders).run(paths)
+    print_import_report(report)
+    return report
+
+def connect() -> Optional[Tuple[str, List[str]]]:
+    """Vérifie la connexion à Anki et retourne le modèle à utiliser et ses champs."""
     if not anki_connect_request("version"):
         print("\n❌ AnkiConnect n'est pas accessible. Lancez Anki.")
-        return
+        return None
 
     model = get_anki_model()
-    if not model: return
+    if not model:
+        return None
     
     fields = get_model_fields(model)
     if not fields or len(fields) < 2:
         print("❌ Le modèle doit avoir au moins 2 champs.")
+        return None
+        
+    return model, fields
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import decks/ CSV files into Anki through AnkiConnect.")
+    parser.add_argument("files", nargs="*", metavar="CSV",
+                        help="CSV files to import (default: choose interactively)")
+    parser.add_argument("--media-workers", type=int, default=DEFAULT_MEDIA_WORKERS,
+                        help=f"Threads uploading media files (default: {DEFAULT_MEDIA_WORKERS})")
+    parser.add_argument("--senders", type=int, default=DEFAULT_SENDERS,
+                        help=f"Threads sending addNotes chunks (default: {DEFAULT_SENDERS})")
+    args = parser.parse_args()
+
+    connection = connect()
+    if not connection:
         return
+    model, fields = connection
 
     # Check CLI args
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
-        if os.path.exists(file_path):
-            import_file(file_path, model, fields)
-        else:
-            print(f"❌ Fichier introuvable : {file_path}")
+    if args.files:
+        missing = [path for path in args.files if not os.path.exists(path)]
+        if missing:
+            print(f"❌ Fichier introuvable : {', '.join(missing)}")
+            return
+        import_files(args.files, model, fields, args.media_workers, args.senders)
     else:
-        interactive_mode(model, fields)
+        interactive_mode(model, fields, args.media_workers, args.senders)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import html
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from typing import Dict, IO, Iterator, List, NamedTuple, Optional, Tuple
+from export_with_media import OUTPUT_DIR, MEDIA_REPO_DIR, deck_paths, replace_media_refs
+from utils import slugify
+
+# --- CONFIGURATION ---
+# Collection files of a package, newest first. "collection.anki21b" (Anki >= 2.1.50)
+# is zstd-compressed and not supported: such decks must be exported with
+# "Support older Anki versions" ticked.
+COLLECTION_NAMES = ("collection.anki21", "collection.anki2")
+UNSUPPORTED_COLLECTION = "collection.anki21b"
+FIELD_SEPARATOR = "\x1f"
+
+class IngestResult(NamedTuple):
+    deck: str
+    csv_path: str
+    cards: int
+    media: int
+    missing_media: List[str]
+    # Notes whose fields after the second (e.g. "Add Reverse") were not empty and were dropped
+    dropped_fields: int = 0
+
+def _copy_stream(source: IO[bytes], dest_path: str) -> int:
+    """Copie un flux vers un fichier par blocs, sans le charger en mémoire."""
+    with open(dest_path, 'wb') as dest:
+        shutil.copyfileobj(source, dest, 1 << 16)
+        return dest.tell()
+
+def read_media_map(package: zipfile.ZipFile) -> Dict[str, str]:
+    """Retourne {nom du fichier dans Anki: nom du membre dans le zip}."""
+    if 'media' not in package.namelist():
+        return {}
+    try:
+        numbered = json.loads(package.read('media').decode('utf-8'))
+    except ValueError:
+        raise ValueError("carte des médias illisible (paquet au format Anki >= 2.1.50 ?)")
+    return {name: member for member, name in numbered.items()}
+
+def extract_collection(package: zipfile.ZipFile, tmp_dir: str) -> str:
+    """Extrait la collection SQLite du paquet dans `tmp_dir` et retourne son chemin."""
+    names = set(package.namelist())
+    # Next to an anki21b collection, "collection.anki2" only holds a placeholder note
+    # asking to update Anki: it must not be ingested as the deck
+    if UNSUPPORTED_COLLECTION in names and COLLECTION_NAMES[0] not in names:
+        raise ValueError("collection au format Anki >= 2.1.50 (réexportez avec « Support older Anki versions »)")
+    for name in COLLECTION_NAMES:
+        if name in names:
+            path = os.path.join(tmp_dir, name)
+            with package.open(name) as source:
+                _copy_stream(source, path)
+            return path
+    raise ValueError("aucune collection lisible (réexportez avec « Support older Anki versions »)")
+
+def read_deck_names(conn: sqlite3.Connection) -> Dict[int, str]:
+    """Noms des decks par id, pour les schémas anciens (JSON dans col) et récents (table decks)."""
+    has_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'decks'").fetchone()
+    if has_table:
+        return {did: name.replace(FIELD_SEPARATOR, "::") for did, name in conn.execute("SELECT id, name FROM decks")}
+    (decks_json,) = conn.execute("SELECT decks FROM col").fetchone()
+    return {int(did): deck['name'] for did, deck in json.loads(decks_json).items()}
+
+def iter_notes(conn: sqlite3.Connection) -> Iterator[Tuple[int, List[str], str]]:
+    """
+    Parcourt les notes (id du deck, champs, tags) dans l'ordre de création.
+    Une note dont les cartes sont dans plusieurs decks est rangée dans le deck de sa première carte.
+    """
+    query = """
+        SELECT c.did, n.flds, n.tags, MIN(c.ord)
+        FROM notes n JOIN cards c ON c.nid = n.id
+        GROUP BY n.id
+        ORDER BY n.id
+    """
+    for did, fields, tags, _ in conn.execute(query):
+        yield did, fields.split(FIELD_SEPARATOR), tags
+
+def note_deck_ids(conn: sqlite3.Connection) -> List[int]:
+    """Ids des decks qui recevront au moins une note (même règle qu'iter_notes)."""
+    query = """
+        SELECT DISTINCT did FROM (
+            SELECT c.did, MIN(c.ord)
+            FROM notes n JOIN cards c ON c.nid = n.id
+            GROUP BY n.id
+        )
+    """
+    return [did for (did,) in conn.execute(query)]
+
+def ingest_apkg(apkg_path: str, subject: Optional[str] = None,
+                decks_dir: str = OUTPUT_DIR, media_dir: str = MEDIA_REPO_DIR,
+                force: bool = False) -> List[IngestResult]:
+    """
+    Écrit les decks d'un paquet .apkg dans decks/<matière>/<deck>.csv et leurs images
+    dans media/<sous-dossier>/, au même format qu'export_with_media.py.
+    Les notes sont lues une à une et les médias copiés par blocs depuis le zip.
+    `subject` remplace la matière déduite du nom du deck (premier niveau).
+    Les decks dont les noms donnent le même fichier y sont écrits ensemble ; un CSV
+    déjà présent dans decks/ n'est remplacé qu'avec `force` (sinon FileExistsError).
+    """
+    with zipfile.ZipFile(apkg_path) as package, tempfile.TemporaryDirectory() as tmp_dir:
+        media_map = read_media_map(package)
+        conn = sqlite3.connect(extract_collection(package, tmp_dir))
+        try:
+            deck_names = read_deck_names(conn)
+            targets = {did: output_paths(deck_names.get(did, "Default"), subject, decks_dir)
+                       for did in note_deck_ids(conn)}
+            existing = sorted({csv_path for csv_path, _ in targets.values() if os.path.exists(csv_path)})
+            if existing and not force:
+                raise FileExistsError(f"{', '.join(os.path.relpath(p, decks_dir) for p in existing)} "
+                                      f"existe(nt) déjà dans decks/ (--force pour remplacer)")
+
+            outputs: Dict[str, Dict] = {}
+            extracted: Dict[str, bool] = {}
+
+            try:
+                for did, fields, tags in iter_notes(conn):
+                    deck_name = deck_names.get(did, "Default")
+                    csv_path, subfolder = targets[did]
+                    out = outputs.get(csv_path)
+                    if out is None:
+                        out = outputs[csv_path] = _open_output(csv_path)
+                    if deck_name not in out['decks']:
+                        out['decks'].append(deck_name)
+
+                    def is_available(filename: str) -> bool:
+                        dest = os.path.join(media_dir, subfolder, filename)
+                        if dest not in extracted:
+                            # Names come from the package: never write outside media/
+                            safe = os.path.basename(filename) == filename and filename not in ('.', '..')
+                            member = media_map.get(filename) if safe else None
+                            if member is not None:
+                                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                                with package.open(member) as source:
+                                    _copy_stream(source, dest)
+                                out['media'] += 1
+                            extracted[dest] = member is not None
+                        if not extracted[dest] and filename not in out['missing']:
+                            out['missing'].append(filename)
+                        return extracted[dest]
+
+                    # decks/ CSVs are always "front;back;tags", whatever the note type
+                    front, back = fields[0], fields[1] if len(fields) > 1 else ""
+                    if any(value.strip() for value in fields[2:]):
+                        out['dropped'] += 1
+                    row = [replace_media_refs(html.unescape(value), subfolder, is_available)
+                           for value in (front, back)]
+                    row.append(" ".join(tags.split()))
+                    out['writer'].writerow(row)
+                    out['cards'] += 1
+            finally:
+                for out in outputs.values():
+                    out['file'].close()
+        finally:
+            conn.close()
+
+    return [IngestResult(", ".join(o['decks']), o['csv_path'], o['cards'], o['media'], o['missing'], o['dropped'])
+            for o in outputs.values()]
+
+def output_paths(deck_name: str, subject: Optional[str], decks_dir: str) -> Tuple[str, str]:
+    """Retourne (chemin du CSV, sous-dossier de media/) d'un deck Anki."""
+    subject_folder, safe_filename, subfolder = deck_paths(deck_name)
+    if subject:
+        # The whole deck name becomes the file name, e.g. "Polynômes::Cours" -> "polynomes_cours"
+        subject_folder = subject
+        safe_filename = "_".join(slugify(p) for p in deck_name.split("::"))
+    return os.path.join(decks_dir, subject_folder, f"{safe_filename}.csv"), subfolder
+
+def _open_output(csv_path: str) -> Dict:
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    f = open(csv_path, "w", encoding="utf-8-sig", newline="")
+    return {'decks': [], 'csv_path': csv_path, 'file': f, 'writer': csv.writer(f, delimiter=";"),
+            'cards': 0, 'media': 0, 'missing': [], 'dropped': 0}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write the decks of .apkg packages to decks/ and media/ without Anki.")
+    parser.add_argument("packages", nargs="+", metavar="APKG", help=".apkg files to ingest")
+    parser.add_argument("--subject", type=str, default=None,
+                        help="Subject folder in decks/, e.g. Maths (default: first level of the deck name)")
+    parser.add_argument("--force", action="store_true", help="Overwrite CSV files already in decks/")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("📦 INGESTION DE PAQUETS .APKG")
+    print("="*60)
+
+    start = time.perf_counter()
+    total_cards = errors = 0
+    for apkg_path in args.packages:
+        print(f"\n📥 {os.path.basename(apkg_path)}")
+        try:
+            results = ingest_apkg(apkg_path, args.subject, force=args.force)
+        except (OSError, ValueError, zipfile.BadZipFile, sqlite3.DatabaseError) as e:
+            print(f"   ❌ {e}")
+            errors += 1
+            continue
+
+        for result in results:
+            total_cards += result.cards
+            print(f"   ✅ {result.deck} -> {os.path.relpath(result.csv_path, os.path.dirname(OUTPUT_DIR))} "
+                  f"({result.cards} cartes, {result.media} médias)")
+            if result.missing_media:
+                print(f"      ⚠️  Médias absents du paquet : {', '.join(result.missing_media)}")
+            if result.dropped_fields:
+                print(f"      ⚠️  {result.dropped_fields} note(s) avec plus de 2 champs : champs suivants ignorés")
+
+    print(f"\n⏱️  {total_cards} cartes en {time.perf_counter() - start:.2f} s"
+          f"{f', {errors} paquet(s) en erreur' if errors else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Point d'entrée unique, non interactif, pour les scripts du dépôt :
+
+    ptsi build    [--subject S] [--glob G] [--tag T] [--force]
+    ptsi index
+    ptsi import   [--subject S] [--glob G] [--tag T]
+    ptsi export   [--subject S] [--glob G] [--all] [--profile P] [--jobs N]
+    ptsi ingest   APKG... [--subject S] [--force]
+    ptsi validate [--subject S] [--glob G] [--tag T]
+
+Les modules lourds (genanki, jinja2, sqlite, AnkiConnect) ne sont importés que
+par la sous-commande qui en a besoin, pour que `--help` reste instantané.
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+def _selected_decks(args: argparse.Namespace) -> list:
+    """Decks de decks/ correspondant aux options --subject/--glob/--tag."""
+    from card_store import compile_store, select_decks
+
+    conn = compile_store()
+    try:
+        return select_decks(conn, args.subject, args.glob, args.tag)
+    finally:
+        conn.close()
+
+def _has_selection(args: argparse.Namespace) -> bool:
+    return bool(args.subject or args.glob or getattr(args, 'tag', None))
+
+# --- COMMANDS ---
+
+def cmd_build(args: argparse.Namespace) -> int:
+    from generate_apkg import build_packages
+
+    selected = None
+    if _has_selection(args):
+        selected = [d.path for d in _selected_decks(args)]
+        if not selected:
+            print("⚠️  Aucun deck ne correspond à la sélection.")
+            return 1
+
+    stats = build_packages(selected, force=args.force)
+    print(f"📦 {stats['success']} généré(s), {stats['skipped']} inchangé(s), {stats['errors']} erreur(s)")
+    return 1 if stats['errors'] else 0
+
+def cmd_index(args: argparse.Namespace) -> int:
+    import generate_index
+
+    generate_index.main()
+    return 0
+
+def cmd_import(args: argparse.Namespace) -> int:
+    from card_store import DECKS_DIR
+    from imports_decks import connect, import_files
+
+    decks = _selected_decks(args)
+    if not decks:
+        print("⚠️  Aucun deck ne correspond à la sélection.")
+        return 1
+
+    connection = connect()
+    if not connection:
+        return 1
+    model, fields = connection
+
+    import_files([os.path.join(DECKS_DIR, d.path) for d in decks], model, fields, args.media_workers, args.senders)
+    return 0
+
+def cmd_export(args: argparse.Namespace) -> int:
+    if not (_has_selection(args) or args.all):
+        print("❌ Précisez --subject, --glob ou --all.")
+        return 2
+
+    from export_with_media import get_anki_media_path, run_export
+    from utils import anki_connect_request
+
+    response = anki_connect_request("deckNames")
+    if not response:
+        return 1
+
+    target_decks = [name for name in response["result"] if args.all or anki_deck_matches(name, args.subject, args.glob)]
+    if not target_decks:
+        print("⚠️  Aucun deck Anki ne correspond à la sélection.")
+        return 1
+
+    results = run_export(target_decks, get_anki_media_path(args.profile), args.jobs, args.media_workers)
+    return 1 if any(r.error for r in results) else 0
+
+def cmd_ingest(args: argparse.Namespace) -> int:
+    import sqlite3
+    import zipfile
+    from ingest_apkg import ingest_apkg
+
+    errors = 0
+    for apkg_path in args.packages:
+        try:
+            results = ingest_apkg(apkg_path, args.subject, force=args.force)
+        except (OSError, ValueError, zipfile.BadZipFile, sqlite3.DatabaseError) as e:
+            print(f"❌ {os.path.basename(apkg_path)} : {e}")
+            errors += 1
+            continue
+        for result in results:
+            missing = f", {len(result.missing_media)} média(s) absent(s)" if result.missing_media else ""
+            dropped = f", {result.dropped_fields} note(s) tronquée(s) à 2 champs" if result.dropped_fields else ""
+            print(f"✅ {result.deck} -> {result.csv_path} ({result.cards} cartes, {result.media} médias{missing}{dropped})")
+    return 1 if errors else 0
+
+def anki_deck_matches(name: str, subjects: List[str], patterns: List[str]) -> bool:
+    """Filtre un nom de deck Anki (Matière::Chapitre) par matière et motif glob, sans casse."""
+    import fnmatch
+
+    if subjects and name.split("::")[0].lower() not in {s.lower() for s in subjects}:
+        return False
+    if patterns:
+        return any(fnmatch.fnmatchcase(name.lower(), p.lower()) for p in patterns)
+    return True
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    from card_store import DECKS_DIR, check_csv, compile_store, load_cards, select_decks
+
+    conn = compile_store()
+    try:
+        decks = select_decks(conn, args.subject, args.glob, args.tag)
+        errors = warnings = 0
+
+        for deck in decks:
+            messages = []
+            for line, reason in check_csv(os.path.join(DECKS_DIR, deck.path)):
+                messages.append(f"❌ ligne {line} : {reason}")
+                errors += 1
+
+            fronts = {}
+            for card in load_cards(conn, [deck.id]):
+                for name, path in card.media:
+                    if path is None:
+                        messages.append(f"❌ ligne {card.line} : média introuvable '{name}'")
+                        errors += 1
+                key = " ".join(card.front.split()).lower()
+                if key in fronts:
+                    messages.append(f"⚠️  ligne {card.line} : même recto que la ligne {fronts[key]}")
+                    warnings += 1
+                else:
+                    fronts[key] = card.line
+
+            if messages or args.verbose:
+                print(f"📄 {deck.path} ({deck.card_count} cartes)")
+                for message in messages:
+                    print(f"   {message}")
+    finally:
+        conn.close()
+
+    print(f"\n📊 {len(decks)} deck(s) : {errors} erreur(s), {warnings} avertissement(s)")
+    return 1 if errors else 0
+
+# --- CLI ---
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ptsi", description="Non-interactive tools for the PTSI Anki decks.")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    def add_selection_args(sub: argparse.ArgumentParser, tags: bool = True,
+                           glob_help: str = "Glob on deck names, e.g. '1[4-7]_*' or 'Maths/*' (repeatable)") -> None:
+        sub.add_argument("--subject", action="append", default=[],
+                         help="Subject folder to include, e.g. Maths (repeatable)")
+        sub.add_argument("--glob", action="append", default=[], help=glob_help)
+        if tags:
+            sub.add_argument("--tag", action="append", default=[],
+                             help="Keep decks with at least one card with this tag (repeatable)")
+
+    build = subparsers.add_parser("build", help="Build .apkg packages and previews (only changed decks)")
+    add_selection_args(build)
+    build.add_argument("--force", action="store_true", help="Rebuild even if nothing changed")
+    build.set_defaults(func=cmd_build)
+
+    index = subparsers.add_parser("index", help="Regenerate decks.html, decks.json and the sitemap")
+    index.set_defaults(func=cmd_index)
+
+    imports = subparsers.add_parser("import", help="Import decks/ CSV files into Anki (AnkiConnect)")
+    add_selection_args(imports)
+    imports.add_argument("--media-workers", type=int, default=4,
+                         help="Threads uploading media files (default: 4)")
+    imports.add_argument("--senders", type=int, default=2,
+                         help="Threads sending addNotes chunks (default: 2)")
+    imports.set_defaults(func=cmd_import)
+
+    export = subparsers.add_parser("export", help="Export Anki decks to decks/ and media/ (AnkiConnect)")
+    add_selection_args(export, tags=False,
+                       glob_help="Glob on full Anki deck names, case-insensitive, e.g. 'Maths::1[4-7]*' (repeatable)")
+    export.add_argument("--all", action="store_true", help="Export every Anki deck")
+    export.add_argument("--profile", type=str, default="Utilisateur 1",
+                        help="Anki user profile name (default: Utilisateur 1)")
+    export.add_argument("--jobs", type=int, default=4, help="Decks exported concurrently (default: 4)")
+    export.add_argument("--media-workers", type=int, default=4,
+                        help="Threads copying media files (default: 4)")
+    export.set_defaults(func=cmd_export)
+
+    ingest = subparsers.add_parser("ingest", help="Write the decks of .apkg files to decks/ and media/ (no Anki needed)")
+    ingest.add_argument("packages", nargs="+", metavar="APKG", help=".apkg files to ingest")
+    ingest.add_argument("--subject", type=str, default=None,
+                        help="Subject folder in decks/, e.g. Maths (default: first level of the deck name)")
+    ingest.add_argument("--force", action="store_true", help="Overwrite CSV files already in decks/")
+    ingest.set_defaults(func=cmd_ingest)
+
+    validate = subparsers.add_parser("validate", help="Check CSV rows, missing media and repeated fronts")
+    add_selection_args(validate)
+    validate.add_argument("-v", "--verbose", action="store_true", help="List decks without problems too")
+    validate.set_defaults(func=cmd_validate)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 
+import html
 import json
-import urllib.request
 import unicodedata
 import re
 import os
@@ -12,6 +12,9 @@ def anki_connect_request(action: str, **params: Any) -> Optional[Dict[str, Any]]
     """
     Communiquer avec Anki via l'add-on AnkiConnect.
     """
+    # Imported here: card_store and the build only need slugify, not the HTTP client
+    import urllib.request
+
     try:
         request_data = json.dumps({
             "action": action,
@@ -45,3 +48,32 @@ def slugify(value: str) -> str:
     value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
     value = re.sub(r'[^\w\s-]', '', value).strip().lower()
     return re.sub(r'[-\s]+', '_', value)
+
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_LATEX_CMD_RE = re.compile(r'\\([a-zA-Z]+)|\\.')
+# Commands that only change the layout of a formula, not its meaning
+_LATEX_LAYOUT_CMDS = {'left', 'right', 'text', 'mathrm', 'displaystyle', 'quad', 'qquad'}
+_MATH_SYMBOLS = {'≤': ' <= ', '≥': ' >= ', '≠': ' neq ', '×': ' times ', '−': ' - '}
+_TOKEN_RE = re.compile(r'[a-z0-9]+|[+\-<>=]')
+
+def strip_html(value: str) -> str:
+    """Retire les balises HTML et les entités, et réduit les espaces."""
+    return " ".join(html.unescape(_HTML_TAG_RE.sub(' ', value)).split())
+
+def normalize_card_text(value: str) -> str:
+    """
+    Normalise le texte d'une carte pour la comparaison entre decks.
+    Supprime le HTML, garde le nom des commandes LaTeX (\\cos -> cos) et les
+    opérateurs + - < > =, retire les accents comme slugify et renvoie des
+    mots en minuscules séparés par un espace.
+    """
+    def latex_command(match: "re.Match") -> str:
+        name = match.group(1)
+        return f" {name} " if name and name not in _LATEX_LAYOUT_CMDS else " "
+
+    value = _LATEX_CMD_RE.sub(latex_command, strip_html(value))
+    for symbol, replacement in _MATH_SYMBOLS.items():
+        value = value.replace(symbol, replacement)
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+    return " ".join(_TOKEN_RE.findall(value.lower()))
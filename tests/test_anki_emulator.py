@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+import csv
+import io
+import shutil
+import tempfile
+import contextlib
+from unittest import mock
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import utils
+import card_store
+import imports_decks
+import export_with_media
+from anki_emulator import AnkiConnectEmulator
+
+class TestAnkiEmulator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.anki_media = os.path.join(self.tmp, "collection.media")
+        os.makedirs(self.anki_media)
+        patcher = mock.patch.object(card_store, "STORE_PATH", os.path.join(self.tmp, "cards.sqlite"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_actions(self):
+        anki = AnkiConnectEmulator()
+        self.assertEqual(anki.handle({"action": "version"})["result"], 6)
+        anki.handle({"action": "createDeck", "params": {"deck": "Maths::Polynomes"}})
+        self.assertEqual(anki.handle({"action": "deckNames"})["result"], ["Default", "Maths", "Maths::Polynomes"])
+
+        note = {"deckName": "Maths::Polynomes", "modelName": "Basic",
+                "fields": {"Front": "Q", "Back": "R"}, "tags": ["t"],
+                "options": {"allowDuplicate": False, "duplicateScope": "deck"}}
+        added = anki.handle({"action": "addNotes", "params": {"notes": [note, note]}})["result"]
+        self.assertIsNotNone(added[0])
+        self.assertIsNone(added[1])
+
+        found = anki.handle({"action": "findNotes", "params": {"query": '"deck:Maths"'}})["result"]
+        info = anki.handle({"action": "notesInfo", "params": {"notes": found}})["result"]
+        self.assertEqual(info[0]["fields"]["Back"], {"value": "R", "order": 1})
+
+        multi = anki.handle({"action": "multi", "params": {"actions": [
+            {"action": "version"}, {"action": "modelFieldNames", "params": {"modelName": "Cloze"}}]}})
+        self.assertEqual(multi["result"], [6, ["Text", "Back Extra"]])
+        self.assertEqual(anki.requests["multi"], 1)
+        self.assertEqual(anki.actions["version"], 2)
+
+        self.assertIsNotNone(anki.handle({"action": "guiBrowse"})["error"])
+
+    def test_import_export_round_trip(self):
+        csv_path = os.path.join(self.tmp, "Maths-Test.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(["Question 1", "Réponse 1", "tag1"])
+            writer.writerow(["Question 2", "Réponse 2", ""])
+
+        out_dir = os.path.join(self.tmp, "out")
+        with AnkiConnectEmulator(media_dir=self.anki_media) as anki, \
+                mock.patch.object(export_with_media, "OUTPUT_DIR", os.path.join(out_dir, "decks")), \
+                mock.patch.object(export_with_media, "MEDIA_REPO_DIR", os.path.join(out_dir, "media")):
+            self.assertEqual(utils.ANKI_CONNECT_URL, anki.url)
+            with contextlib.redirect_stdout(io.StringIO()):
+                imports_decks.import_file(csv_path, "Basic", ["Front", "Back"])
+                export_with_media.export_deck("Maths::Test", self.anki_media)
+
+            self.assertEqual(len(anki.notes), 2)
+            self.assertEqual(anki.requests["addNotes"], 1)
+            self.assertEqual(anki.requests["findNotes"], 1)
+            self.assertEqual(anki.requests["notesInfo"], 1)
+
+        self.assertNotEqual(utils.ANKI_CONNECT_URL, anki.url)
+        with open(os.path.join(out_dir, "decks", "maths", "test.csv"), encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f, delimiter=";"))
+        self.assertEqual(rows, [["Question 1", "Réponse 1", "tag1"], ["Question 2", "Réponse 2", ""]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import sys
+import os
+import csv
+import shutil
+import tempfile
+from unittest import mock
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import card_store
+from card_store import compile_store, load_decks, load_cards, find_deck, media_sha1, media_subfolder
+
+class TestCardStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.decks_dir = os.path.join(self.tmp, "decks")
+        self.media_dir = os.path.join(self.tmp, "media")
+        self.store_path = os.path.join(self.tmp, "build", "cards.sqlite")
+        os.makedirs(os.path.join(self.decks_dir, "SI"))
+        os.makedirs(os.path.join(self.media_dir, "liaisons"))
+        with open(os.path.join(self.media_dir, "liaisons", "pivot.jpg"), "wb") as f:
+            f.write(b"jpg")
+
+        self.csv_path = os.path.join(self.decks_dir, "SI", "SI-Liaisons.csv")
+        self.write_csv([
+            ["Pivot", '<img src="../media/liaisons/pivot.jpg"> <img src="absent.png">', "si liaison"],
+            ["", ""],
+            ["Seul"],
+            ["Glissière", '""Translation""'],
+        ])
+
+    def write_csv(self, rows):
+        with open(self.csv_path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f, delimiter=";").writerows(rows)
+
+    def compile(self):
+        conn = compile_store(self.decks_dir, self.media_dir, self.store_path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_media_subfolder(self):
+        self.assertEqual(media_subfolder("SI", "SI-Cycle5-Valeurs_à_connaitre"), "cycle5_valeurs_a_connaitre")
+        self.assertEqual(media_subfolder("Maths", "chapitre_4_complexes"), "chapitre_4_complexes")
+
+    def test_compile(self):
+        conn = self.compile()
+        decks = load_decks(conn)
+        self.assertEqual([(d.path, d.subject, d.base_name, d.card_count) for d in decks],
+                         [(os.path.join("SI", "SI-Liaisons.csv"), "SI", "SI-Liaisons", 2)])
+
+        cards = load_cards(conn, [decks[0].id])
+        self.assertEqual([c.line for c in cards], [1, 4])
+        self.assertEqual(cards[0].front, "Pivot")
+        self.assertEqual(cards[0].back, '<img src="pivot.jpg"> <img src="absent.png">')
+        self.assertEqual(cards[0].tags, ["si", "liaison"])
+        self.assertEqual(cards[0].media, [
+            ("pivot.jpg", os.path.join(self.media_dir, "liaisons", "pivot.jpg")),
+            ("absent.png", None),
+        ])
+        self.assertEqual(cards[1].back, "Translation")
+        self.assertEqual(find_deck(conn, self.csv_path, self.decks_dir).id, decks[0].id)
+
+    def test_incremental(self):
+        conn = self.compile()
+        first = load_decks(conn)[0]
+        conn.close()
+
+        conn = self.compile()
+        self.assertEqual(load_decks(conn)[0], first)
+        conn.close()
+
+        self.write_csv([["Rotule", "Trois rotations"]])
+        os.utime(self.csv_path, ns=(0, 0))
+        conn = self.compile()
+        deck = load_decks(conn)[0]
+        self.assertNotEqual(deck.sha1, first.sha1)
+        self.assertEqual([c.front for c in load_cards(conn, [deck.id])], ["Rotule"])
+
+        os.remove(self.csv_path)
+        conn.close()
+        conn = self.compile()
+        self.assertEqual(load_decks(conn), [])
+
+    def test_media_sha1_cache(self):
+        conn = self.compile()
+        image = os.path.join(self.media_dir, "liaisons", "pivot.jpg")
+        first = media_sha1(conn, image)
+        with mock.patch.object(card_store, "file_sha1") as file_sha1:
+            self.assertEqual(media_sha1(conn, image), first)
+        file_sha1.assert_not_called()
+
+        with open(image, "wb") as f:
+            f.write(b"png")
+        os.utime(image, ns=(0, 0))
+        self.assertNotEqual(media_sha1(conn, image), first)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+from card_store import StoredCard, StoredDeck
+from compose_deck import PackageCache, make_selection, deck_matches, card_matches, serve
+
+class TestComposeDeck(unittest.TestCase):
+    def test_make_selection(self):
+        a = make_selection(["Maths", " maths "], ["1[4-7]_*"], ["X"])
+        b = make_selection(["MATHS"], ["1[4-7]_*"], ["x", ""])
+        self.assertEqual(a, b)
+        self.assertEqual(a.subjects, ("maths",))
+
+    def test_matches(self):
+        deck = StoredDeck(1, os.path.join("Maths", "15_Polynômes.csv"), "Maths", "15_Polynômes", "sha", 10)
+        self.assertTrue(deck_matches(deck, make_selection(["maths"], ["1[4-7]_*"])))
+        self.assertTrue(deck_matches(deck, make_selection(decks=["maths/*"])))
+        self.assertFalse(deck_matches(deck, make_selection(["si"])))
+        self.assertFalse(deck_matches(deck, make_selection(decks=["chapitre*"])))
+
+        card = StoredCard(1, "Q", "R", ["Algebre", "def"], "sha", [])
+        self.assertTrue(card_matches(card, make_selection(tags=["algebre"])))
+        self.assertFalse(card_matches(card, make_selection(tags=["analyse"])))
+
+    def test_cache_lru(self):
+        cache = PackageCache(max_bytes=10)
+        self.assertEqual(cache.get_or_build("a", lambda: b"aaaa"), (b"aaaa", False))
+        self.assertEqual(cache.get_or_build("a", lambda: b"????"), (b"aaaa", True))
+        cache.get_or_build("b", lambda: b"bbbb")
+        cache.get_or_build("a", lambda: b"????")  # "a" becomes most recent
+        cache.get_or_build("c", lambda: b"cccc")  # evicts "b"
+        self.assertEqual(cache.get_or_build("b", lambda: b"BBBB"), (b"BBBB", False))
+        self.assertLessEqual(cache.stats()["bytes"], 10)
+
+    def test_cache_single_build(self):
+        cache = PackageCache(max_bytes=1000)
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.05)
+            return b"data"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_build("k", build)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(sorted(cached for _, cached in results), [False, True, True, True, True])
+
+    def test_cache_build_error(self):
+        cache = PackageCache(max_bytes=1000)
+        with self.assertRaises(ValueError):
+            cache.get_or_build("k", lambda: (_ for _ in ()).throw(ValueError("vide")))
+        self.assertEqual(cache.get_or_build("k", lambda: b"ok"), (b"ok", False))
+
+    def test_server_errors(self):
+        import urllib.error
+        import urllib.request
+
+        class FailingComposer:
+            def compose(self, selection):
+                if selection.subjects == ("vide",):
+                    raise ValueError("Aucun deck")
+                raise OSError("disque plein")
+
+        server = serve(FailingComposer(), "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        base = f"http://127.0.0.1:{server.server_address[1]}/compose?subject="
+        for subject, status in (("vide", 400), ("maths", 500)):
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(base + subject)
+            self.assertEqual(ctx.exception.code, status)
+
+if __name__ == '__main__':
+    unittest.main()
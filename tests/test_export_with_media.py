@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import csv
+import io
+import shutil
+import tempfile
+import contextlib
+from unittest import mock
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import export_with_media
+from anki_emulator import AnkiConnectEmulator
+
+class TestExportWithMedia(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.anki_media = os.path.join(self.tmp, "collection.media")
+        os.makedirs(self.anki_media)
+        with open(os.path.join(self.anki_media, "a.jpg"), "wb") as f:
+            f.write(b"jpg")
+
+        self.out_dir = os.path.join(self.tmp, "out")
+        for name, folder in (("OUTPUT_DIR", "decks"), ("MEDIA_REPO_DIR", "media")):
+            patcher = mock.patch.object(export_with_media, name, os.path.join(self.out_dir, folder))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def add_deck(self, anki, deck):
+        anki.handle({"action": "createDeck", "params": {"deck": deck}})
+        anki.handle({"action": "addNotes", "params": {"notes": [
+            {"deckName": deck, "modelName": "Basic",
+             "fields": {"Front": f"Q {deck}", "Back": '<img src="a.jpg">'}, "tags": []}]}})
+
+    def test_concurrent_export(self):
+        decks = [f"Maths::Chapitre {i}" for i in range(4)]
+        with AnkiConnectEmulator(latency=0.05, media_dir=self.anki_media) as anki:
+            for deck in decks:
+                self.add_deck(anki, deck)
+
+            anki.max_in_flight = 0
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = export_with_media.export_decks(list(reversed(decks)), self.anki_media,
+                                                         jobs=4, media_workers=2)
+
+        # Requests from several decks were waiting on AnkiConnect at the same time
+        self.assertGreater(anki.max_in_flight, 1)
+        self.assertEqual([r.deck for r in results], list(reversed(decks)))
+        self.assertEqual([(r.cards, r.media_copied, r.error) for r in results], [(1, 1, None)] * 4)
+        self.assertTrue(os.path.exists(os.path.join(self.out_dir, "media", "chapitre_0", "a.jpg")))
+        with open(results[0].csv_path, encoding="utf-8-sig") as f:
+            self.assertEqual(list(csv.reader(f, delimiter=";")),
+                             [["Q Maths::Chapitre 3", '<img src="../media/chapitre_3/a.jpg">', ""]])
+
+    def test_failed_media_copy_keeps_src(self):
+        with AnkiConnectEmulator(media_dir=self.anki_media) as anki, \
+                mock.patch.object(export_with_media.shutil, "copy2", side_effect=OSError("disque plein")):
+            self.add_deck(anki, "Maths::Test")
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = export_with_media.export_decks(["Maths::Test"], self.anki_media, jobs=1, media_workers=1)
+
+        self.assertEqual((results[0].media_copied, results[0].media_errors), (0, ["disque plein"]))
+        with open(results[0].csv_path, encoding="utf-8-sig") as f:
+            self.assertEqual(list(csv.reader(f, delimiter=";")), [["Q Maths::Test", '<img src="a.jpg">', ""]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+from find_duplicates import find_clusters, build_report
+
+class TestFindDuplicates(unittest.TestCase):
+    def test_exact_duplicates(self):
+        texts = ["une frontiere", "competitif", "une frontiere"]
+        self.assertEqual(find_clusters(texts), [[0, 2]])
+
+    def test_near_duplicates(self):
+        texts = [
+            "quelle est la definition d une famille generatrice d un espace vectoriel",
+            "la derivee de la fonction exponentielle",
+            "quelle est la definition d une famille generatrice d un espace vectoriel e",
+        ]
+        self.assertEqual(find_clusters(texts), [[0, 2]])
+
+    def test_distinct_texts(self):
+        texts = ["torseur cinematique", "developpement limite", "espace vectoriel"]
+        self.assertEqual(find_clusters(texts), [])
+
+    def test_build_report(self):
+        cards = [
+            ("Anglais/a.csv", 1, "une frontière", "a border"),
+            ("Anglais/b.csv", 4, "une <b>frontière</b>", "a border"),
+        ]
+        report = build_report(cards)
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['type'], 'exact')
+        self.assertEqual(report[0]['decks'], ["Anglais/a.csv", "Anglais/b.csv"])
+
+    def test_formulas_differing_by_function_or_sign(self):
+        cards = [
+            ("Maths/a.csv", 1, r"\(\cos(p)+\cos(q)=\)", r"\(2\cos\left(\frac{p+q}{2}\right)\cos\left(\frac{p-q}{2}\right)=\)"),
+            ("Maths/a.csv", 2, r"\(\cos(p)-\cos(q)=\)", r"\(-2\sin\left(\frac{p+q}{2}\right)\sin\left(\frac{p-q}{2}\right)=\)"),
+            ("Maths/a.csv", 3, r"\(\sin(p)+\sin(q)=\)", r"\(2\sin\left(\frac{p+q}{2}\right)\cos\left(\frac{p-q}{2}\right)=\)"),
+            ("Maths/b.csv", 7, r"\(\cos(p)+\cos(q)=\)", r"\(2\cos\left(\frac{p+q}{2}\right)\cos\left(\frac{p-q}{2}\right)=\)"),
+        ]
+        report = build_report(cards)
+        exact = [c for c in report if c['type'] == 'exact']
+        self.assertEqual(len(exact), 1)
+        self.assertEqual([(c['file'], c['line']) for c in exact[0]['cards']], [("Maths/a.csv", 1), ("Maths/b.csv", 7)])
+
+    def test_exact_requires_same_source(self):
+        cards = [("a.csv", 1, "Définition", ""), ("b.csv", 1, "Definition", "")]
+        self.assertEqual([c['type'] for c in build_report(cards)], ['proche'])
+
+    def test_image_only_cards(self):
+        cards = [
+            ("a.csv", 1, '<img src="paste-1de4862dabf9.jpg">', ""),
+            ("b.csv", 1, '<img src="paste-88cc18270ecd.jpg">', ""),
+            ("c.csv", 1, '<img src="../media/c/paste-1de4862dabf9.jpg">', ""),
+            ("d.csv", 1, "<br>", "&nbsp;"),
+            ("e.csv", 1, "<b></b>", ""),
+        ]
+        report = build_report(cards)
+        self.assertEqual([(c['type'], c['decks']) for c in report], [('exact', ["a.csv", "c.csv"])])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import generate_apkg
+from card_store import StoredCard, StoredDeck, compile_store
+
+class TestGenerateApkg(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.deck = StoredDeck(1, "SI/a.csv", "SI", "a", "csvsha", 1)
+        empty = os.path.join(self.tmp, "empty")
+        os.makedirs(empty)
+        self.conn = compile_store(empty, empty, os.path.join(self.tmp, "cards.sqlite"))
+        self.addCleanup(self.conn.close)
+
+    def make_checkout(self, name, image_content):
+        media_dir = os.path.join(self.tmp, name, "media")
+        os.makedirs(os.path.join(media_dir, "a"))
+        image = os.path.join(media_dir, "a", "img.jpg")
+        with open(image, "wb") as f:
+            f.write(image_content)
+        return media_dir, [StoredCard(1, '<img src="img.jpg">', "R", [], "sha", [("img.jpg", image)])]
+
+    def input_hash(self, media_dir, cards):
+        saved = generate_apkg.MEDIA_DIR
+        generate_apkg.MEDIA_DIR = media_dir
+        try:
+            return generate_apkg.deck_input_hash(self.conn, self.deck, cards)
+        finally:
+            generate_apkg.MEDIA_DIR = saved
+
+    def test_input_hash_ignores_checkout_location(self):
+        first = self.input_hash(*self.make_checkout("one", b"jpg"))
+        self.assertEqual(first, self.input_hash(*self.make_checkout("two", b"jpg")))
+
+    def test_input_hash_follows_image_content(self):
+        first = self.input_hash(*self.make_checkout("one", b"jpg"))
+        self.assertNotEqual(first, self.input_hash(*self.make_checkout("two", b"other jpg")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+from generate_index import build_subjects_index, build_precache_manifest
+
+class TestGenerateIndex(unittest.TestCase):
+    def test_build_subjects_index(self):
+        data = {
+            "Maths": [{"name": "Polynômes", "cards": 30}, {"name": "Matrices", "cards": 12}],
+            "Anglais": [{"name": "u1", "cards": 50}],
+        }
+        index = build_subjects_index(data)
+        self.assertEqual(index["total_decks"], 3)
+        self.assertEqual(index["total_cards"], 92)
+        self.assertEqual(index["total_subjects"], 2)
+        self.assertEqual(index["subjects"], [
+            {"name": "Anglais", "slug": "anglais", "decks": 1, "cards": 50, "url": "subjects/anglais.json"},
+            {"name": "Maths", "slug": "maths", "decks": 2, "cards": 42, "url": "subjects/maths.json"},
+        ])
+
+    def test_empty(self):
+        index = build_subjects_index({})
+        self.assertEqual(index["subjects"], [])
+        self.assertEqual(index["total_decks"], 0)
+
+    def test_precache_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for path, content in [("decks.html", "<html>"), ("js/main.js", "x"), ("previews/Maths-é.json", "[]"),
+                                  ("media/a.jpg", "img"), ("decks/Maths-é.apkg", "zip")]:
+                (root / path).parent.mkdir(parents=True, exist_ok=True)
+                (root / path).write_text(content, encoding="utf-8")
+
+            manifest = build_precache_manifest(root)
+            assets = {a["url"]: a for a in manifest["assets"]}
+            self.assertEqual(sorted(assets), ["decks.html", "js/main.js", "media/a.jpg", "previews/Maths-é.json"])
+            self.assertTrue(assets["js/main.js"]["precache"])
+            self.assertFalse(assets["previews/Maths-é.json"]["precache"])
+            self.assertEqual(assets["media/a.jpg"]["size"], 3)
+
+            # The version only changes when a file does
+            self.assertEqual(build_precache_manifest(root)["version"], manifest["version"])
+            (root / "js/main.js").write_text("y", encoding="utf-8")
+            changed = build_precache_manifest(root)
+            self.assertNotEqual(changed["version"], manifest["version"])
+            self.assertEqual([a["url"] for a in changed["assets"] if a["hash"] != assets[a["url"]]["hash"]], ["js/main.js"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import csv
+import io
+import shutil
+import tempfile
+import contextlib
+from unittest import mock
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import card_store
+import imports_decks
+from anki_emulator import AnkiConnectEmulator, AnkiConnectError
+
+class TestImportPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.anki_media = os.path.join(self.tmp, "collection.media")
+        os.makedirs(self.anki_media)
+
+        # CSV files outside decks/ are parsed directly; media/ and the store are temporary ones
+        self.image = "paste-1de4862dabf9b88cc18270ecdf6d2f91cf358631.jpg"
+        os.makedirs(os.path.join(self.tmp, "decks"))
+        os.makedirs(os.path.join(self.tmp, "media", "si_a"))
+        with open(os.path.join(self.tmp, "media", "si_a", self.image), "wb") as f:
+            f.write(b"jpg")
+        for name, value in (("DECKS_DIR", os.path.join(self.tmp, "decks")),
+                            ("MEDIA_DIR", os.path.join(self.tmp, "media")),
+                            ("STORE_PATH", os.path.join(self.tmp, "build", "cards.sqlite"))):
+            patcher = mock.patch.object(card_store, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_pipelined_import(self):
+        image = self.image
+        paths = []
+        for name in ("SI-A.csv", "SI-B.csv"):
+            path = os.path.join(self.tmp, name)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f, delimiter=";")
+                for i in range(5):
+                    writer.writerow([f"{name} Q{i}", f'<img src="{image}">', ""])
+            paths.append(path)
+        paths.append(os.path.join(self.tmp, "absent.csv"))
+
+        with AnkiConnectEmulator(media_dir=self.anki_media) as anki:
+            pipeline = imports_decks.ImportPipeline("Basic", ["Front", "Back"], media_workers=2, senders=2,
+                                                    chunk_notes=2)
+            report = pipeline.run(paths)
+
+            self.assertEqual(len(anki.notes), 10)
+            self.assertEqual(anki.requests["addNotes"], 6)  # chunks of at most 2 notes
+            self.assertEqual(anki.requests["createDeck"], 2)
+            self.assertEqual(anki.requests["storeMediaFile"], 1)  # shared image sent once
+        self.assertTrue(os.path.exists(os.path.join(self.anki_media, image)))
+
+        self.assertEqual((report.cards, report.added, report.media), (10, 10, 1))
+        self.assertEqual([(f["deck"], f["added"]) for f in report.files[:2]], [("SI::A", 5), ("SI::B", 5)])
+        self.assertIsNotNone(report.files[2]["error"])
+        self.assertEqual([s.items for s in report.stages], [10, 1, 10])
+
+    def test_pipelined_import_deck_error(self):
+        path = os.path.join(self.tmp, "SI-A.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            for i in range(3):
+                writer.writerow([f"Q{i}", f"R{i}", ""])
+
+        with AnkiConnectEmulator() as anki, \
+                mock.patch.object(anki, "_action_createDeck", side_effect=AnkiConnectError("deck refusé")):
+            pipeline = imports_decks.ImportPipeline("Basic", ["Front", "Back"], media_workers=1, senders=1,
+                                                    chunk_notes=2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = pipeline.run([path])
+
+            self.assertEqual(anki.requests["createDeck"], 2)  # retried for the second chunk
+            self.assertEqual(anki.requests["addNotes"], 0)
+        self.assertEqual(report.files[0]["added"], 0)
+        self.assertIn("SI::A", report.files[0]["error"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import sys
+import os
+import csv
+import shutil
+import tempfile
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import genanki
+from generate_apkg import get_ptsi_model
+from ingest_apkg import ingest_apkg
+
+class TestIngestApkg(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+        image = os.path.join(self.tmp, "schema.png")
+        with open(image, "wb") as f:
+            f.write(b"\x89PNG" + bytes(range(256)) * 100)
+
+        model = get_ptsi_model()
+        polynomes = genanki.Deck(1, "Maths::Polynômes")
+        polynomes.add_note(genanki.Note(model=model, fields=["Degré &amp; racines", 'Voir <img src="schema.png">'],
+                                        tags=["algebre", "def"]))
+        polynomes.add_note(genanki.Note(model=model, fields=["Q2", '<img src="absent.png">']))
+        vocabulary = genanki.Deck(2, "Vocabulaire")
+        vocabulary.add_note(genanki.Note(model=model, fields=["word", "mot"]))
+
+        self.apkg = os.path.join(self.tmp, "shared.apkg")
+        package = genanki.Package([polynomes, vocabulary])
+        package.media_files = [image]
+        package.write_to_file(self.apkg)
+
+        self.decks_dir = os.path.join(self.tmp, "decks")
+        self.media_dir = os.path.join(self.tmp, "media")
+
+    def read_rows(self, path):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            return list(csv.reader(f, delimiter=";"))
+
+    def test_round_trip(self):
+        results = {r.deck: r for r in ingest_apkg(self.apkg, decks_dir=self.decks_dir, media_dir=self.media_dir)}
+        self.assertEqual(sorted(results), ["Maths::Polynômes", "Vocabulaire"])
+
+        maths = results["Maths::Polynômes"]
+        self.assertEqual(maths.csv_path, os.path.join(self.decks_dir, "maths", "polynomes.csv"))
+        self.assertEqual((maths.cards, maths.media, maths.missing_media), (2, 1, ["absent.png"]))
+        self.assertEqual(self.read_rows(maths.csv_path), [
+            ["Degré & racines", 'Voir <img src="../media/polynomes/schema.png">', "algebre def"],
+            ["Q2", '<img src="absent.png">', ""],
+        ])
+        with open(os.path.join(self.media_dir, "polynomes", "schema.png"), "rb") as f:
+            self.assertEqual(f.read(), b"\x89PNG" + bytes(range(256)) * 100)
+
+        self.assertEqual(results["Vocabulaire"].csv_path, os.path.join(self.decks_dir, "divers", "vocabulaire.csv"))
+
+    def test_extra_fields(self):
+        model = genanki.Model(3, "Basic (optional reversed card)",
+                              fields=[{"name": "Front"}, {"name": "Back"}, {"name": "Add Reverse"}],
+                              templates=[{"name": "Card 1", "qfmt": "{{Front}}", "afmt": "{{Back}}"}])
+        deck = genanki.Deck(3, "Maths::Algèbre")
+        deck.add_note(genanki.Note(model=model, fields=["Q", "R", "y"], tags=["alg"]))
+        deck.add_note(genanki.Note(model=model, fields=["Q2", "R2", ""], tags=["alg"]))
+        apkg = os.path.join(self.tmp, "reverse.apkg")
+        genanki.Package(deck).write_to_file(apkg)
+
+        (result,) = ingest_apkg(apkg, decks_dir=self.decks_dir, media_dir=self.media_dir)
+        self.assertEqual(result.dropped_fields, 1)
+        self.assertEqual(self.read_rows(result.csv_path), [["Q", "R", "alg"], ["Q2", "R2", "alg"]])
+
+    def test_same_csv_and_existing_file(self):
+        model = get_ptsi_model()
+        cours = genanki.Deck(4, "Maths::Ch 1::Cours")
+        cours.add_note(genanki.Note(model=model, fields=["Q1", "R1"]))
+        flat = genanki.Deck(5, "Maths::Ch 1 Cours")
+        flat.add_note(genanki.Note(model=model, fields=["Q2", "R2"]))
+        apkg = os.path.join(self.tmp, "same.apkg")
+        genanki.Package([cours, flat]).write_to_file(apkg)
+
+        (result,) = ingest_apkg(apkg, decks_dir=self.decks_dir, media_dir=self.media_dir)
+        self.assertEqual(result.cards, 2)
+        self.assertEqual(sorted(self.read_rows(result.csv_path)), [["Q1", "R1", ""], ["Q2", "R2", ""]])
+
+        with self.assertRaises(FileExistsError):
+            ingest_apkg(apkg, decks_dir=self.decks_dir, media_dir=self.media_dir)
+        self.assertEqual(ingest_apkg(apkg, decks_dir=self.decks_dir, media_dir=self.media_dir, force=True)[0].cards, 2)
+
+    def test_subject_override(self):
+        results = ingest_apkg(self.apkg, subject="Maths", decks_dir=self.decks_dir, media_dir=self.media_dir)
+        self.assertEqual(sorted(os.path.relpath(r.csv_path, self.decks_dir) for r in results),
+                         [os.path.join("Maths", "maths_polynomes.csv"), os.path.join("Maths", "vocabulaire.csv")])
+
+    def test_not_a_collection(self):
+        import zipfile
+        bad = os.path.join(self.tmp, "bad.apkg")
+        with zipfile.ZipFile(bad, "w") as z:
+            z.writestr("collection.anki21b", b"zstd")
+            z.writestr("media", b"\x28\xb5\x2f\xfd")
+        with self.assertRaises(ValueError):
+            ingest_apkg(bad, decks_dir=self.decks_dir, media_dir=self.media_dir)
+
+    def test_anki21b_with_placeholder(self):
+        import zipfile
+        # Anki >= 2.1.50 also writes a legacy collection holding a single "please update" note
+        with zipfile.ZipFile(self.apkg) as z:
+            placeholder = z.read("collection.anki2")
+        newer = os.path.join(self.tmp, "newer.apkg")
+        with zipfile.ZipFile(newer, "w") as z:
+            z.writestr("collection.anki21b", b"zstd")
+            z.writestr("collection.anki2", placeholder)
+        with self.assertRaises(ValueError):
+            ingest_apkg(newer, decks_dir=self.decks_dir, media_dir=self.media_dir)
+        self.assertFalse(os.path.exists(self.decks_dir))
+
+if __name__ == '__main__':
+    unittest.main()
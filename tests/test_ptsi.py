@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+import io
+import contextlib
+import csv
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+
+# Add scripts folder to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
+
+import ptsi
+import card_store
+from anki_emulator import AnkiConnectEmulator
+
+class TestPtsiCli(unittest.TestCase):
+    def setUp(self):
+        # A small decks/ tree, so the tests never compile or write the repo's own store
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        decks_dir = os.path.join(self.tmp, "decks")
+        for rel_path in ("Maths/15_Polynômes.csv", "Maths/16_Dimension_Finie.csv", "SI/SI-Liaisons.csv"):
+            path = os.path.join(decks_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f, delimiter=";").writerow([f"Q {rel_path}", "R", ""])
+        os.makedirs(os.path.join(self.tmp, "media"))
+
+        for name, value in (("DECKS_DIR", decks_dir), ("MEDIA_DIR", os.path.join(self.tmp, "media")),
+                            ("STORE_PATH", os.path.join(self.tmp, "build", "cards.sqlite"))):
+            patcher = mock.patch.object(card_store, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_help_does_not_import_heavy_modules(self):
+        code = ("import sys, ptsi\n"
+                "try: ptsi.main(['build', '--help'])\n"
+                "except SystemExit: pass\n"
+                "print(sorted(m for m in ('genanki', 'jinja2', 'sqlite3') if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(ptsi.__file__),
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.splitlines()[-1], "[]")
+
+    def test_anki_deck_matches(self):
+        self.assertTrue(ptsi.anki_deck_matches("Maths::15 Polynômes", ["maths"], []))
+        self.assertTrue(ptsi.anki_deck_matches("Maths::15 Polynômes", [], ["maths::1[4-7]*"]))
+        self.assertFalse(ptsi.anki_deck_matches("Maths::15 Polynômes", ["SI"], []))
+        self.assertFalse(ptsi.anki_deck_matches("Maths", [], ["anglais::*"]))
+
+    def test_export_requires_selection(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(ptsi.main(["export"]), 2)
+
+    def test_import_selection(self):
+        with AnkiConnectEmulator() as anki, contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(ptsi.main(["import", "--subject", "Maths", "--glob", "15_*"]), 0)
+            decks = anki.handle({"action": "deckNames"})["result"]
+            self.assertEqual(len(anki.notes), 1)
+        self.assertEqual(decks, ["15 Polynômes", "Default"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ import os
 # Add scripts folder to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
 
-from utils import slugify
+from utils import slugify, normalize_card_text
 
 class TestUtils(unittest.TestCase):
     def test_slugify(self):
@@ -15,5 +15,12 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(slugify("Special-Char_test"), "special_char_test")
         self.assertEqual(slugify("C'est l'été"), "cest_lete")
 
+    def test_normalize_card_text(self):
+        self.assertEqual(normalize_card_text("Définition d'un <b>maximum</b>"), "definition d un maximum")
+        self.assertEqual(normalize_card_text(r"\( E = \text{Vect}(x_1) \)"), "e = vect x 1")
+        self.assertEqual(normalize_card_text(r"\(\cos(p)+\cos(q)=\)"), "cos p + cos q =")
+        self.assertNotEqual(normalize_card_text("f>0"), normalize_card_text("f<0"))
+        self.assertEqual(normalize_card_text('<img src="../media/a.jpg"> &amp; été'), "ete")
+
 if __name__ == '__main__':
     unittest.main()